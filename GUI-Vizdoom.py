@@ -34,6 +34,7 @@ import string
 from objects.TA2_logic import TA2Logic
 
 from skills.Navigation import Navigator
+from skills.tracing import trace
 
 class ThreadedProcessingExample(threading.Thread):
     def __init__(self, processing_object: list, response_queue: queue.Queue):
@@ -121,7 +122,7 @@ class TA2Agent(TA2Logic):
         # or sooner if possible.
         self.end_experiment_early = False
 
-        self.navigator = Navigator() #use the vizdoom pathway and don't use a gui
+        self.navigator = Navigator(background_planning = True) #use the vizdoom pathway and don't use a gui, plan off the frame loop
         self.alphabet = list(string.ascii_lowercase)
         self.human_control = True
         self.walls = None
@@ -582,5 +583,5 @@ class TA2Agent(TA2Logic):
 if __name__ == "__main__":
     print('controls a:left, d: right, w:forward, s:backward, j:shoot, k:turn left, l:turn right, q:QUIT, any other key: nothing')
     agent = TA2Agent()
-    print("DEBUGGING, RUNNING")
+    trace.agent.info("running")
     agent.run()
@@ -0,0 +1,50 @@
+'''
+Times planning many journeys on a generated map one at a time with Navigator.plan_journey against skills.batch.BatchPlanner,
+and checks both give the same number of moves for every query. Run from the repository root:
+    python -m benchmarks.batch --rows 4 --cols 4 --queries 400 --workers 4
+'''
+import argparse
+import random
+import time
+
+from skills.Navigation import Navigator
+from skills.batch import BatchPlanner, point
+from benchmarks.mapgen import generate_map
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type = int, default = 4)
+    parser.add_argument("--cols", type = int, default = 4)
+    parser.add_argument("--diagonals", type = float, default = 0.0, help = "chance of cutting each room corner")
+    parser.add_argument("--obstacles", type = int, default = 0, help = "obstacles per room")
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes, defaults to the number of cores")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    feature_vector, centers = generate_map(args.rows, args.cols, diagonals = args.diagonals, obstacles = args.obstacles, seed = args.seed)
+    navigator = Navigator(map_cache = False)
+    navigator.update_features(feature_vector)
+    rng = random.Random(args.seed)
+    queries = [tuple(centers[key] for key in rng.sample(list(centers.keys()), 2)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    sequential = []
+    for origin, destination in queries:
+        path = navigator.plan_journey(point(origin), point(destination))
+        sequential.append(None if path == None else len(path) - 1)
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with BatchPlanner(navigator, workers = args.workers) as planner:
+        startup_time = time.perf_counter() - start
+        batched = planner.costs(queries)
+    batch_time = time.perf_counter() - start
+
+    reached = sum(cost != None for cost in sequential)
+    print(f"{len(queries)} queries on a {args.rows}x{args.cols} map, {reached} reachable")
+    print(f"one at a time: {sequential_time * 1000:.0f} ms, batch with {planner.workers} workers: {batch_time * 1000:.0f} ms "
+        f"({startup_time * 1000:.0f} ms of it starting the pool), {sum(a != b for a, b in zip(sequential, batched))} differing costs")
+
+if __name__ == "__main__":
+    main()
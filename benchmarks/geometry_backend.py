@@ -0,0 +1,108 @@
+'''
+Times the Decimal and float geometry backends on the same map and checks that both produce the same topology (corners, doorways, rooms).
+Run from the repository root:
+    python -m benchmarks.geometry_backend --rooms 12 --repeat 3
+'''
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from skills.Navigation import Navigator
+from skills.geometry import set_backend, distance_to_line, distances_to_segments, segments_array, coord_tuple, backend
+
+#a row of rectangular rooms joined by short corridors, room heights are jittered so no walls of different rooms end up collinear
+def corridor_map(rooms, seed = 0):
+    rng = random.Random(seed)
+    walls = []
+    def wall(a, b):
+        walls.append({"x1": a[0], "y1": a[1], "x2": b[0], "y2": b[1]})
+    width, gap = 256, 32
+    spans = [(-rng.randrange(100, 200) - i, rng.randrange(100, 200) + i) for i in range(rooms)] #(bottom, top) of each room
+    doors = [(-rng.randrange(10, 40) - 0.5 * i, rng.randrange(10, 40) + 0.5 * i) for i in range(rooms - 1)] #(bottom, top) of each corridor
+    outline = [] #walk the outline of the whole map counterclockwise, bottom edge first
+    for i in range(rooms):
+        left, right = i * (width + gap), i * (width + gap) + width
+        if i > 0:
+            outline += [(left, doors[i - 1][0]), (left, spans[i][0])]
+        else:
+            outline += [(left, spans[i][0])]
+        outline += [(right, spans[i][0])]
+        if i < rooms - 1:
+            outline += [(right, doors[i][0])]
+        else:
+            outline += [(right, spans[i][1])]
+    for i in reversed(range(rooms)):
+        left, right = i * (width + gap), i * (width + gap) + width
+        if i < rooms - 1:
+            outline += [(right, doors[i][1]), (right, spans[i][1])]
+        outline += [(left, spans[i][1])]
+        if i > 0:
+            outline += [(left, doors[i - 1][1])]
+    for i in range(len(outline)):
+        wall(outline[i], outline[(i + 1) % len(outline)])
+    return walls, (width / 2, 0)
+
+def build(backend_name, walls, spawn):
+    set_backend(backend_name)
+    nav = Navigator(map_cache = False) #time the map being built, not loaded
+    feature_vector = {"enemies": [], "items": {"obstacle": []}, "walls": walls,
+        "player": {"x_position": spawn[0], "y_position": spawn[1], "angle": 0}}
+    with contextlib.redirect_stdout(io.StringIO()): #setup_map is chatty
+        start = time.perf_counter()
+        nav.update_features(feature_vector)
+        elapsed = time.perf_counter() - start
+    return nav, elapsed
+
+#everything that depends on the geometry, as plain floats so the two backends can be compared directly
+def topology(nav):
+    def point(c):
+        return (round(float(c.x), 6), round(float(c.y), 6))
+    def line(l):
+        return tuple(sorted((point(l.coords[0]), point(l.coords[1]))))
+    corners = sorted((line(wall), tuple(sorted(point(c) for c in wall.all_corners))) for wall in nav.walls)
+    doorways = sorted(line(doorway) for doorway in nav.doorways)
+    rooms = sorted((tuple(sorted(line(d) for d in room.doorways)), len(room.walls)) for room in nav.rooms)
+    return corners, doorways, rooms
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type = int, default = 12)
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    walls, spawn = corridor_map(args.rooms, args.seed)
+    results = {}
+    for backend_name in ("decimal", "float"):
+        times = []
+        for _ in range(args.repeat):
+            nav, elapsed = build(backend_name, walls, spawn)
+            times.append(elapsed)
+        results[backend_name] = (min(times), topology(nav))
+        print(f"{backend_name:>8}: setup_map best of {args.repeat} = {min(times) * 1000:.1f} ms "
+            f"({len(walls)} walls, {len(nav.doorways)} doorways, {len(nav.rooms)} rooms)")
+    set_backend("decimal")
+    print(f"speedup: {results['decimal'][0] / results['float'][0]:.2f}x")
+    print(f"same topology: {results['decimal'][1] == results['float'][1]}")
+
+    #distance from a sweep of points to every wall, the per-line loop verify_action used to do against the vectorized array version
+    points = [(x, y) for x in range(0, 256 * args.rooms, 32) for y in range(-96, 96, 32)]
+    for backend_name in ("decimal", "float"):
+        nav, _ = build(backend_name, walls, spawn)
+        lines = list(nav.walls)
+        start = time.perf_counter()
+        for x, y in points:
+            point = coord_tuple(backend.number(x), backend.number(y))
+            min(distance_to_line(point, line) for line in lines)
+        print(f"{backend_name:>8}: {len(points)} points x {len(lines)} walls with distance_to_line = {(time.perf_counter() - start) * 1000:.1f} ms")
+    segments = segments_array(lines)
+    start = time.perf_counter()
+    for x, y in points:
+        distances_to_segments((x, y), segments).min()
+    print(f"   numpy: {len(points)} points x {len(lines)} walls with distances_to_segments = {(time.perf_counter() - start) * 1000:.1f} ms")
+    set_backend("decimal")
+
+if __name__ == "__main__":
+    main()
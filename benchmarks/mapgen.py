@@ -0,0 +1,153 @@
+'''
+Procedural maps for benchmarking the navigation stack without VizDoom.
+A grid of rectangular rooms joined by corridors along a random spanning tree, so the map is one closed outline like a Doom map.
+Every room and corridor gets its own jittered coordinates, which keeps walls of different rooms from ever being collinear
+(setup_map would read the gap between collinear walls as a doorway). Rooms can have their corners cut by diagonal walls
+and can hold obstacles. Preview a map's walls as JSON (python -m skills.map_cache accepts the output):
+    python -m benchmarks.mapgen --rows 3 --cols 4 --diagonals --obstacles 2 > map.json
+'''
+import argparse
+import json
+import random
+
+class UniqueCoords:
+    '''
+    Hands out integer coordinates near the requested value that no other line along the same axis has used yet.
+    '''
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.used = set()
+
+    def near(self, value, spread):
+        while True:
+            ret = int(value) + self.rng.randint(-spread, spread)
+            if ret not in self.used:
+                self.used.add(ret)
+                return ret
+
+#random spanning tree over the rows x cols grid of rooms, a list of ((row, col), (row, col)) links
+def spanning_tree(rows, cols, rng):
+    start = (rng.randrange(rows), rng.randrange(cols))
+    visited = {start}
+    stack = [start]
+    links = []
+    while len(stack) > 0:
+        row, col = stack[-1]
+        options = [(row + dr, col + dc) for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0))
+            if 0 <= row + dr < rows and 0 <= col + dc < cols and (row + dr, col + dc) not in visited]
+        if len(options) == 0:
+            stack.pop()
+            continue
+        nxt = rng.choice(options)
+        visited.add(nxt)
+        links.append(((row, col), nxt))
+        stack.append(nxt)
+    return links
+
+'''
+Build a map, returns a feature vector Navigator.update_features accepts (walls, player at the center of a room, obstacles, no enemies)
+and the center of every room as {(row, col): (x, y)} to use as destinations.
+room_size is the nominal width of a room, corridor the gap between neighbouring rooms, door the nominal width of a corridor.
+diagonals is the chance each room corner gets cut by a diagonal wall, obstacles is how many obstacles go in each room.
+'''
+def generate_map(rows, cols, room_size = 320, corridor = 64, door = 80, diagonals = 0.0, obstacles = 0, seed = 0):
+    rng = random.Random(seed)
+    xs, ys = UniqueCoords(rng), UniqueCoords(rng) #x of vertical lines, y of horizontal lines
+    pitch = room_size + corridor
+    spread = corridor // 4 #how far a room's sides move from the nominal grid
+
+    rooms = {} #(row, col) -> [left, bottom, right, top]
+    for row in range(rows):
+        for col in range(cols):
+            left, bottom = col * pitch, row * pitch
+            rooms[(row, col)] = [xs.near(left, spread), ys.near(bottom, spread), xs.near(left + room_size, spread), ys.near(bottom + room_size, spread)]
+
+    mouths = {key: {"left": None, "bottom": None, "right": None, "top": None} for key in rooms} #side -> (low, high) of the corridor opening
+    walls = []
+    def wall(a, b):
+        walls.append({"x1": a[0], "y1": a[1], "x2": b[0], "y2": b[1]})
+
+    chamfer = room_size // 6 #how much of each side a cut corner takes up, corridors stay clear of it
+    for a, b in spanning_tree(rows, cols, rng):
+        if a > b:
+            a, b = b, a
+        ra, rb = rooms[a], rooms[b]
+        if a[0] == b[0]: #side by side, horizontal corridor from a's right side to b's left side
+            low_limit, high_limit = max(ra[1], rb[1]) + chamfer + 8, min(ra[3], rb[3]) - chamfer - 8
+            center = rng.randint(low_limit + door // 2, high_limit - door // 2)
+            low, high = ys.near(center - door // 2, 4), ys.near(center + door // 2, 4)
+            mouths[a]["right"], mouths[b]["left"] = (low, high), (low, high)
+            wall((ra[2], low), (rb[0], low))
+            wall((ra[2], high), (rb[0], high))
+        else: #stacked, vertical corridor from a's top side to b's bottom side
+            low_limit, high_limit = max(ra[0], rb[0]) + chamfer + 8, min(ra[2], rb[2]) - chamfer - 8
+            center = rng.randint(low_limit + door // 2, high_limit - door // 2)
+            low, high = xs.near(center - door // 2, 4), xs.near(center + door // 2, 4)
+            mouths[a]["top"], mouths[b]["bottom"] = (low, high), (low, high)
+            wall((low, ra[3]), (low, rb[1]))
+            wall((high, ra[3]), (high, rb[1]))
+
+    centers = {}
+    items = []
+    for key, (left, bottom, right, top) in rooms.items():
+        #walk the corners counterclockwise, a cut corner is replaced by the two ends of its diagonal
+        cuts = [rng.random() < diagonals for _ in range(4)]
+        def cut(): #uneven cuts so no two diagonals share a slope
+            return chamfer - rng.randint(0, chamfer // 2)
+        points = []
+        corners = [(left, bottom), (right, bottom), (right, top), (left, top)]
+        directions = [((0, -1), (1, 0)), ((1, 0), (0, 1)), ((0, 1), (-1, 0)), ((-1, 0), (0, -1))] #(direction coming into, direction leaving) each corner
+        sides = ["bottom", "right", "top", "left"] #side leaving each corner
+        for i, (x, y) in enumerate(corners):
+            if cuts[i]:
+                (ix, iy), (ox, oy) = directions[i]
+                c_in, c_out = cut(), cut()
+                points.append(((x - ix * c_in, y - iy * c_in), None))
+                points.append(((x + ox * c_out, y + oy * c_out), sides[i]))
+            else:
+                points.append(((x, y), sides[i]))
+        for i, (point, side) in enumerate(points):
+            nxt = points[(i + 1) % len(points)][0]
+            mouth = mouths[key].get(side) if side != None else None
+            if mouth == None:
+                wall(point, nxt)
+                continue
+            #split the side around the corridor opening, keeping the walk counterclockwise
+            low, high = mouth
+            if side == "bottom":
+                wall(point, (low, bottom)); wall((high, bottom), nxt)
+            elif side == "right":
+                wall(point, (right, low)); wall((right, high), nxt)
+            elif side == "top":
+                wall(point, (high, top)); wall((low, top), nxt)
+            else:
+                wall(point, (left, high)); wall((left, low), nxt)
+
+        centers[key] = ((left + right) // 2, (bottom + top) // 2)
+        margin = chamfer + 32
+        for _ in range(obstacles): #anywhere away from the walls and the room's center (the default spawn and destination)
+            while True:
+                x, y = rng.randint(left + margin, right - margin), rng.randint(bottom + margin, top - margin)
+                if abs(x - centers[key][0]) > 48 or abs(y - centers[key][1]) > 48:
+                    break
+            items.append({"x_position": x, "y_position": y})
+
+    spawn = centers[(0, 0)]
+    feature_vector = {"enemies": [], "items": {"obstacle": items}, "walls": walls,
+        "player": {"x_position": spawn[0], "y_position": spawn[1], "angle": 0}}
+    return feature_vector, centers
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type = int, default = 3)
+    parser.add_argument("--cols", type = int, default = 3)
+    parser.add_argument("--diagonals", nargs = "?", type = float, const = 0.5, default = 0.0, help = "chance of cutting each room corner")
+    parser.add_argument("--obstacles", type = int, default = 0, help = "obstacles per room")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+    feature_vector, _ = generate_map(args.rows, args.cols, diagonals = args.diagonals, obstacles = args.obstacles, seed = args.seed)
+    print(json.dumps(feature_vector))
+
+if __name__ == "__main__":
+    main()
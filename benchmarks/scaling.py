@@ -0,0 +1,135 @@
+'''
+Times each stage of the navigation stack on generated maps of increasing size and writes the results as JSON,
+so a change to the skills package can be compared against an earlier run. Run from the repository root:
+    python -m benchmarks.scaling --sizes 2x2,4x4,6x6 --diagonals 0.5 --obstacles 1 --output scaling.json
+Stages: setup_map (the whole map interpretation, discover_room timed inside it), identify_room and room_at from every room's center,
+static_occupancy for the tile bias of every room's center, pathfind (and pathfind_astar) from there to each of the room's doorways,
+verify_action on a sweep of moves, and route between random pairs of rooms.
+'''
+import argparse
+import contextlib
+import json
+import platform
+import random
+import time
+
+import skills.Navigation as navigation
+from skills.Navigation import Navigator, create_ray, identify_room
+from skills.geometry import set_backend, coord_tuple, backend
+from benchmarks.mapgen import generate_map
+
+class Stage:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def record(self, seconds):
+        self.calls += 1
+        self.seconds += seconds
+
+    def result(self):
+        return {"calls": self.calls, "total_ms": self.seconds * 1000, "mean_us": self.seconds * 1e6 / self.calls if self.calls > 0 else None}
+
+#time every call to module.name made inside the block, used for functions setup_map calls internally
+@contextlib.contextmanager
+def timed_function(module, name, stage):
+    original = getattr(module, name)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            stage.record(time.perf_counter() - start)
+    setattr(module, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+def timed(stage, function, *args):
+    start = time.perf_counter()
+    ret = function(*args)
+    stage.record(time.perf_counter() - start)
+    return ret
+
+def point(coords):
+    return coord_tuple(backend.number(coords[0]), backend.number(coords[1]))
+
+def run_size(rows, cols, args):
+    feature_vector, centers = generate_map(rows, cols, diagonals = args.diagonals, obstacles = args.obstacles, seed = args.seed)
+    stages = {name: Stage() for name in ("setup_map", "discover_room", "identify_room", "room_at", "static_occupancy", "pathfind", "pathfind_astar", "verify_action", "route")}
+
+    for _ in range(args.repeat): #the map is only kept from the last repeat
+        nav = Navigator(map_cache = False)
+        with timed_function(navigation, "discover_room", stages["discover_room"]):
+            timed(stages["setup_map"], nav.update_features, feature_vector)
+
+    rooms = {}
+    for key, center in centers.items():
+        location = point(center)
+        rooms[key] = timed(stages["identify_room"], lambda: identify_room(create_ray(location, nav.max_x, nav.ray_candidates(location))))
+        timed(stages["room_at"], nav.room_at, location.x, location.y)
+
+    paths = 0
+    for key, center in centers.items():
+        location = point(center)
+        for doorway in rooms[key].doorways if rooms[key] != None else ():
+            nav.set_tile_bias(location)
+            timed(stages["static_occupancy"], nav.static_occupancy) #rebuilt for every new tile bias, kept out of the searches' times
+            nav.previous_doorway = doorway
+            nav.replanner = None #time the full search, not a repair
+            path = timed(stages["pathfind"], nav.pathfind, location, doorway.midpoint())[0]
+            timed(stages["pathfind_astar"], nav.pathfind_astar, location, doorway.midpoint())
+            paths += path != None
+    nav.previous_doorway = None
+
+    rng = random.Random(args.seed)
+    for key, center in centers.items():
+        for _ in range(16):
+            location = point((center[0] + rng.randint(-96, 96), center[1] + rng.randint(-96, 96)))
+            for new_location, action in nav.adjacent_coords(location):
+                timed(stages["verify_action"], nav.verify_action, location, new_location, action, rooms[key])
+
+    keys = list(centers.keys())
+    for _ in range(4 * len(keys)):
+        a, b = rng.choice(keys), rng.choice(keys)
+        timed(stages["route"], nav.doorway_graph.route, rooms[a], point(centers[a]), rooms[b], point(centers[b]))
+
+    return {
+        "rows": rows, "cols": cols,
+        "walls": len(feature_vector["walls"]), "obstacles": len(feature_vector["items"]["obstacle"]),
+        "doorways": len(nav.doorways), "rooms": len(nav.rooms), "paths_found": paths,
+        "stages": {name: stage.result() for name, stage in stages.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default = "2x2,3x3,4x4,6x6,8x8", help = "comma separated ROWSxCOLS, at least two rooms each")
+    parser.add_argument("--diagonals", type = float, default = 0.0, help = "chance of cutting each room corner")
+    parser.add_argument("--obstacles", type = int, default = 0, help = "obstacles per room")
+    parser.add_argument("--repeat", type = int, default = 1, help = "how many times to run setup_map per size")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--backend", choices = ("decimal", "float"), default = "decimal")
+    parser.add_argument("--output", default = "scaling.json")
+    args = parser.parse_args()
+    set_backend(args.backend)
+
+    results = []
+    for size in args.sizes.split(","):
+        rows, cols = (int(n) for n in size.lower().split("x"))
+        result = run_size(rows, cols, args)
+        results.append(result)
+        stages = result["stages"]
+        print(f"{rows}x{cols}: {result['walls']} walls, {result['rooms']} rooms | " +
+            ", ".join(f"{name} {stage['total_ms'] / max(stage['calls'], 1):.2f} ms" for name, stage in stages.items()) + " (per call)")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "python": platform.python_version(), "backend": args.backend, "seed": args.seed,
+            "diagonals": args.diagonals, "obstacles": args.obstacles, "repeat": args.repeat,
+            "results": results,
+        }, f, indent = 1)
+    print(f"wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
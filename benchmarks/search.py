@@ -0,0 +1,95 @@
+'''
+Compares the tile searches Navigator.pathfind can dispatch to on generated maps: A* (pathfind_astar), a fresh D* Lite search
+(pathfind_incremental), Jump Point Search (pathfind_jump_points) and hierarchical planning's search on the room's own grid
+(pathfind_hierarchical, its time includes building the room grids). Every search gets the same queries, from each room's center to each of its doorways and to random spots in the same room, and the expansions, wall time and path lengths are written as JSON.
+Bigger rooms are where Jump Point Search pays off. Run from the repository root:
+    python -m benchmarks.search --sizes 2x2,3x3 --room-size 640 --output search.json
+'''
+import argparse
+import json
+import platform
+import random
+import time
+
+from skills.Navigation import Navigator, create_ray, identify_room
+from skills.geometry import coord_tuple, backend
+from benchmarks.mapgen import generate_map
+
+SEARCHES = ("pathfind_astar", "pathfind_incremental", "pathfind_jump_points", "pathfind_hierarchical")
+
+def point(coords):
+    return coord_tuple(backend.number(coords[0]), backend.number(coords[1]))
+
+def run_size(rows, cols, args):
+    feature_vector, centers = generate_map(rows, cols, room_size = args.room_size, diagonals = args.diagonals, obstacles = args.obstacles, seed = args.seed)
+    nav = Navigator(map_cache = False)
+    nav.update_features(feature_vector)
+    rng = random.Random(args.seed)
+    margin = args.room_size // 4
+
+    queries = [] #(start, destination, doorway headed through)
+    for key, center in centers.items():
+        location = point(center)
+        room = identify_room(create_ray(location, nav.max_x, nav.ray_candidates(location)))
+        for doorway in room.doorways if room != None else ():
+            queries.append((location, doorway.midpoint(), doorway))
+        for _ in range(args.spots):
+            queries.append((location, point((center[0] + rng.randint(-margin, margin), center[1] + rng.randint(-margin, margin))), None))
+
+    results = {name: {"expanded": 0, "seconds": 0.0, "moves": 0, "found": 0} for name in SEARCHES}
+    mismatched = 0 #queries where a search found a different number of moves than A*
+    for start, destination, doorway in queries:
+        nav.set_tile_bias(start)
+        nav.previous_doorway = doorway
+        nav.planning_occupancy() #built outside the timings, every search reads the same grid
+        lengths = []
+        for name in SEARCHES:
+            nav.replanner = None #a fresh D* Lite search, not a repair
+            start_time = time.perf_counter()
+            path_tiles = getattr(nav, name)(start, destination)[0]
+            results[name]["seconds"] += time.perf_counter() - start_time
+            results[name]["expanded"] += nav.expanded_nodes
+            if path_tiles != None:
+                results[name]["found"] += 1
+                results[name]["moves"] += len(path_tiles) - 1
+            lengths.append(None if path_tiles == None else len(path_tiles))
+        mismatched += len(set(lengths)) > 1
+    nav.previous_doorway = None
+
+    for result in results.values():
+        result["total_ms"] = result.pop("seconds") * 1000
+        result["mean_expanded"] = result["expanded"] / len(queries)
+    return {
+        "rows": rows, "cols": cols, "room_size": args.room_size, "queries": len(queries), "mismatched": mismatched,
+        "walls": len(feature_vector["walls"]), "rooms": len(nav.rooms), "searches": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default = "2x2,3x3", help = "comma separated ROWSxCOLS, at least two rooms each")
+    parser.add_argument("--room-size", type = int, default = 640)
+    parser.add_argument("--diagonals", type = float, default = 0.0, help = "chance of cutting each room corner")
+    parser.add_argument("--obstacles", type = int, default = 0, help = "obstacles per room")
+    parser.add_argument("--spots", type = int, default = 4, help = "random destinations per room besides its doorways")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--output", default = "search.json")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes.split(","):
+        rows, cols = (int(n) for n in size.lower().split("x"))
+        result = run_size(rows, cols, args)
+        results.append(result)
+        print(f"{rows}x{cols}, {result['queries']} queries, {result['mismatched']} with differing path lengths | " +
+            ", ".join(f"{name} {search['mean_expanded']:.0f} expanded {search['total_ms'] / result['queries']:.2f} ms"
+                for name, search in result["searches"].items()) + " (per query)")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "python": platform.python_version(), "seed": args.seed, "room_size": args.room_size,
+            "diagonals": args.diagonals, "obstacles": args.obstacles, "results": results,
+        }, f, indent = 1)
+    print(f"wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
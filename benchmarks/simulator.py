@@ -0,0 +1,197 @@
+'''
+Headless stand-in for the TA1 VizDoom feature vector stream, runs the same agent loop as TA2Agent.training_instance
+(update_features, review_action, travel_to) against a generated map without VizDoom or cv2 windows.
+Each frame the simulator emits a VizDoom shaped feature vector and applies the returned action with a simple movement model:
+moves go one unit (16.0076) relative to the player's angle and are blocked by walls, obstacles and enemies, turns rotate by turn_step degrees.
+Reports per frame latency percentiles and frames to goal. Run from the repository root:
+    python -m benchmarks.simulator --rows 3 --cols 3 --episodes 20 --enemies 2 --output simulator.json
+'''
+import argparse
+import json
+import math
+import random
+import time
+
+import numpy as np
+
+from skills.Navigation import Navigator
+from benchmarks.mapgen import generate_map
+
+UNIT = 16.0076 #how far a single move takes the player in VizDoom
+MOVES = {"forward": 0, "left": 90, "backward": 180, "right": 270} #direction of each move relative to the player's angle
+
+class Simulator:
+    '''
+    The world the agent plays in: walls, obstacles, wandering enemies and the player, all in VizDoom's coordinates and feature vector format.
+    '''
+
+    def __init__(self, feature_vector, centers, enemies = 0, turn_step = 45, player_radius = 16, enemy_radius = 20, seed = 0):
+        self.rng = random.Random(seed)
+        self.walls = feature_vector["walls"]
+        self.segments = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in self.walls], dtype = np.float64)
+        self.obstacles = [dict(obstacle) for obstacle in feature_vector["items"]["obstacle"]]
+        self.centers = list(centers.values())
+        self.turn_step = turn_step
+        self.player_radius = player_radius
+        self.enemy_radius = enemy_radius
+        self.x, self.y = (float(feature_vector["player"]["x_position"]), float(feature_vector["player"]["y_position"]))
+        self.angle = 0
+        self.enemies = []
+        for i in range(enemies): #each enemy wanders around a spot off the center of a random room, the centers are where episodes start and end
+            center = self.rng.choice(self.centers)
+            home = (center[0] + self.rng.choice((-1, 1)) * self.rng.randint(64, 96), center[1] + self.rng.randint(-64, 64))
+            self.enemies.append({"id": i, "name": "ZombieMan", "x_position": float(home[0]), "y_position": float(home[1]),
+                "angle": 0, "health": 20, "home": home})
+
+    def place_player(self, location, angle = 0):
+        self.x, self.y = float(location[0]), float(location[1])
+        self.angle = angle
+
+    def feature_vector(self):
+        return {
+            "player": {"x_position": self.x, "y_position": self.y, "angle": self.angle, "health": 100, "ammo": 50},
+            "enemies": [{key: value for key, value in enemy.items() if key != "home"} for enemy in self.enemies],
+            "items": {"obstacle": [dict(obstacle) for obstacle in self.obstacles], "health": [], "ammo": [], "trap": []},
+            "walls": self.walls,
+            "image": None,
+        }
+
+    #is the swept move from (x, y) to (new_x, new_y) clear of walls, obstacles and enemies (checked at its middle and end)
+    def clear(self, x, y, new_x, new_y, radius, ignore = None):
+        for px, py in (((x + new_x) / 2, (y + new_y) / 2), (new_x, new_y)):
+            start = self.segments[:, 0:2]
+            delta = self.segments[:, 2:4] - start
+            length_squared = np.einsum("ij,ij->i", delta, delta)
+            t = np.clip(np.einsum("ij,ij->i", np.array([px, py]) - start, delta) / length_squared, 0, 1)
+            closest = start + delta * t[:, None]
+            if np.hypot(px - closest[:, 0], py - closest[:, 1]).min() < radius:
+                return False
+            for obstacle in self.obstacles:
+                if math.hypot(px - obstacle["x_position"], py - obstacle["y_position"]) < radius:
+                    return False
+            for enemy in self.enemies:
+                if enemy is not ignore and math.hypot(px - enemy["x_position"], py - enemy["y_position"]) < radius + self.enemy_radius - self.player_radius:
+                    return False
+        return True
+
+    def step(self, action):
+        name = action["action"] if isinstance(action, dict) else action
+        if name in MOVES:
+            heading = math.radians(self.angle + MOVES[name])
+            new_x, new_y = self.x + UNIT * round(math.cos(heading), 12), self.y + UNIT * round(math.sin(heading), 12)
+            if self.clear(self.x, self.y, new_x, new_y, self.player_radius):
+                self.x, self.y = new_x, new_y
+        elif name == "turn_left":
+            self.angle = (self.angle + self.turn_step) % 360
+        elif name == "turn_right":
+            self.angle = (self.angle - self.turn_step) % 360
+        self.move_enemies()
+
+    #enemies take a random step, staying near their home and out of the player's way
+    def move_enemies(self):
+        for enemy in self.enemies:
+            heading = self.rng.uniform(0, 2 * math.pi)
+            new_x = enemy["x_position"] + 8 * math.cos(heading)
+            new_y = enemy["y_position"] + 8 * math.sin(heading)
+            if (abs(new_x - enemy["home"][0]) < 32 and abs(new_y - enemy["home"][1]) < 32 and
+                    math.hypot(new_x - self.x, new_y - self.y) > self.player_radius + self.enemy_radius and
+                    self.clear(enemy["x_position"], enemy["y_position"], new_x, new_y, self.enemy_radius, ignore = enemy)):
+                enemy["x_position"], enemy["y_position"] = new_x, new_y
+
+#one navigation task through the same calls TA2Agent.training_instance makes, returns the per frame latencies, frames taken and whether the goal was reached
+#frame_time is slept between frames (outside the timings) like the game's tics, which is when a background planner gets to run
+def run_episode(simulator, navigator, destination, max_frames = 1000, goal_radius = 24, frame_time = 0):
+    latencies = []
+    more_actions = True
+    frames = 0
+    while more_actions and frames < max_frames:
+        feature_vector = simulator.feature_vector()
+        start = time.perf_counter()
+        navigator.update_features(feature_vector)
+        navigator.review_action()
+        action, more_actions = navigator.travel_to(destination[0], destination[1])
+        latencies.append(time.perf_counter() - start)
+        simulator.step(action)
+        frames += 1
+        if frame_time > 0:
+            time.sleep(frame_time)
+    navigator.clear_pathfinding()
+    reached = math.hypot(simulator.x - destination[0], simulator.y - destination[1]) < goal_radius
+    return latencies, frames, reached
+
+def percentiles(values):
+    if len(values) == 0:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ms = np.array(values) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)), "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type = int, default = 3)
+    parser.add_argument("--cols", type = int, default = 3)
+    parser.add_argument("--diagonals", type = float, default = 0.0, help = "chance of cutting each room corner")
+    parser.add_argument("--obstacles", type = int, default = 0, help = "obstacles per room")
+    parser.add_argument("--enemies", type = int, default = 0)
+    parser.add_argument("--episodes", type = int, default = 10)
+    parser.add_argument("--max-frames", type = int, default = 1000)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--geometry-backend", choices = ("decimal", "float"), default = "decimal")
+    parser.add_argument("--any-angle", action = "store_true", help = "plan with Lazy Theta* and move diagonally")
+    parser.add_argument("--jump-points", action = "store_true", help = "search the tiles with Jump Point Search")
+    parser.add_argument("--hierarchical", action = "store_true", help = "route with real moves inside rooms and keep each room's paths")
+    parser.add_argument("--background", action = "store_true", help = "plan segments on a worker thread, best with --frame-time")
+    parser.add_argument("--frame-time", type = float, default = 0.0, help = "seconds to wait between frames, VizDoom runs at 1/35")
+    parser.add_argument("--output", default = None, help = "also write the results as JSON")
+    args = parser.parse_args()
+
+    feature_vector, centers = generate_map(args.rows, args.cols, diagonals = args.diagonals, obstacles = args.obstacles, seed = args.seed)
+    simulator = Simulator(feature_vector, centers, enemies = args.enemies, seed = args.seed)
+    navigator = Navigator(geometry_backend = args.geometry_backend, map_cache = False, any_angle = args.any_angle,
+        jump_points = args.jump_points, hierarchical = args.hierarchical,
+        background_planning = args.background)
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter() #the first frame builds the map, it's reported on its own
+    navigator.update_features(simulator.feature_vector())
+    setup = time.perf_counter() - start
+
+    latencies, episodes = [], []
+    keys = list(centers.keys())
+    for episode in range(args.episodes):
+        origin, goal = rng.sample(keys, 2)
+        simulator.place_player(centers[origin])
+        frame_latencies, frames, reached = run_episode(simulator, navigator, centers[goal], args.max_frames, frame_time = args.frame_time)
+        latencies += frame_latencies
+        episodes.append({"from": list(origin), "to": list(goal), "frames": frames, "reached": reached,
+            "latency_ms": percentiles(frame_latencies)})
+        print(f"episode {episode}: {origin} -> {goal}, {frames} frames, {'reached' if reached else 'DID NOT REACH'} the goal")
+    navigator.stop_planning()
+
+    reached = [e["frames"] for e in episodes if e["reached"]]
+    summary = {
+        "map": {"rows": args.rows, "cols": args.cols, "walls": len(feature_vector["walls"]), "rooms": len(navigator.rooms),
+            "obstacles": len(simulator.obstacles), "enemies": args.enemies, "diagonals": args.diagonals, "seed": args.seed},
+        "any_angle": args.any_angle, "jump_points": args.jump_points, "hierarchical": args.hierarchical,
+        "background": args.background, "frame_time": args.frame_time,
+        "setup_ms": setup * 1000,
+        "frames": len(latencies),
+        "latency_ms": percentiles(latencies),
+        "reached": len(reached), "episodes": len(episodes),
+        "frames_to_goal": {"mean": float(np.mean(reached)) if len(reached) > 0 else None,
+            "median": float(np.median(reached)) if len(reached) > 0 else None},
+        "path_cache": navigator.path_cache.stats(),
+        "per_episode": episodes,
+    }
+    latency = summary["latency_ms"]
+    print(f"setup {summary['setup_ms']:.1f} ms, {summary['frames']} frames: p50 {latency['p50']:.3f} ms, p95 {latency['p95']:.3f} ms, "
+        f"p99 {latency['p99']:.3f} ms, max {latency['max']:.3f} ms")
+    print(f"reached {summary['reached']}/{summary['episodes']} goals, frames to goal: mean {summary['frames_to_goal']['mean']}, "
+        f"median {summary['frames_to_goal']['median']}")
+    print(f"path cache: {summary['path_cache']['hits']} hits, {summary['path_cache']['misses']} misses, {summary['path_cache']['invalidations']} invalidated")
+    if args.output != None:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent = 1)
+        print(f"wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,53 @@ from collections import namedtuple
 from functools import reduce
 import sys
 import math
+import heapq
+import threading
 from skills.doorways import *
+from skills.spatial import *
+from skills.occupancy import *
+from skills.routing import *
+from skills.incremental import DStarLite
+from skills.anyangle import LazyThetaStar
+from skills.jumppoint import JumpPointSearch
+from skills.hierarchy import RoomPaths
+from skills.pathcache import PathCache
+from skills.background import PlanningThread
+from skills.navmap import NavMap
+from skills.tracing import trace
+from skills.entities import EntityStore
+from skills.map_cache import load_map, save_map, default_cache_dir
 import itertools
 
 class Navigator():
 
-    def __init__(self, walls = None, debugging = False, manual_input = False):
-        self.unit = Decimal("16.0076")     #the size of a tile, or the distance the player travels in one move
+    def __init__(self, walls = None, debugging = False, manual_input = False, geometry_backend = None, map_cache = False, incremental = True,
+            any_angle = False, jump_points = False, hierarchical = False, path_cache_size = 128,
+            background_planning = False, nav_map = None):
+        if geometry_backend != None: #"decimal" or "float", this is shared by every navigator since the geometry module is
+            set_backend(geometry_backend)
+        self.map_cache = default_cache_dir() if map_cache == True else map_cache #directory of processed maps, True for the default one, False (the default) is no cache
+        self.unit = backend.number("16.0076")     #the size of a tile, or the distance the player travels in one move
         self.current_location = None
         self.walls = set()
         self.obstacles = [] #obstacle objects, dictionaries
         self.enemies = []
-        self.wall_tiles = set() #tiles tied to walls
+        self.wall_tiles = None #tiles tied to walls, filled in by walls_to_tiles the first time they're needed
         self.obstacles_old = set() #tiles tied to obstacles (don't move all game but are different every game, may be deprecated in favor of wall_tiles)
-        self.temporary_tiles = set() #constantly moving objects like enemies
         self.access_tiles = set() #temporarily block access to certain areas (finding a new path to destination or blocking out all other doorways)
+        self.player_radius = 16 #how close the agent's center can get to walls, doorways and obstacles
+        self.enemy_radius = 20 #enemies are larger than people
+        self.enemy_store = EntityStore(self.enemy_radius) #enemies and obstacles as arrays for vectorized collision checks, refreshed in update_features
+        self.obstacle_store = EntityStore(self.player_radius)
+        self.occupancy = None #walls and obstacles rasterized at tile resolution, rebuilt whenever the tile bias changes
+        self.doorway_cells = {} #doorway -> the cells of self.occupancy it blocks when we aren't heading through it
+        self.base = None #static occupancy plus doorways and access_tiles, rebuilt when any of those change
+        self.base_key = None #what self.base was built from
+        self.dynamic = None #enemies' footprints over the same tiles as self.occupancy, updated cell by cell as they move
+        self.path_cache = PathCache(path_cache_size) #paths planned before, reused when the same segment is planned against the same blocked tiles
+        self.blocking_state = None #the obstacle count and access tiles the blocking version was last checked against
+        self.blocking_version = 0 #bumped whenever the obstacles or access tiles a search avoids change in a way that can shorten paths
+        self.cache_lock = threading.RLock() #guards path_cache and room_paths, background planning snapshots share them with the navigator
         if walls != None:
             self.walls_raw = walls
             self.setup_map()
@@ -25,20 +57,48 @@ class Navigator():
         self.map_corners = set()
         self.doorways = set()
         self.rooms = set()
+        self.line_index = None #spatial hash over the walls and doorways, built in setup_map
+        self.room_index = None #the rooms' polygons indexed for point location, built with the NavMap
+        self.doorway_graph = None #doorways weighted by the moves between them, built in setup_map to route between rooms
+        self.nav_map = None #the static map (walls, doorways, rooms, corners and their indexes), can be shared with other navigators
         self.path_actions = [] #set of instructions to reach a location
         self.path_tiles = [] #used for movement verification
+        self.path_coords = [] #where each action should leave the agent, only used by any angle paths
         self.path_doorways = [] #set of doorways to reach location
         self.path_rooms = []
         self.destination = None #the destination of the pathfinding
         self.tile_bias = None
-        self.tile_divider = Decimal(1) #the fineness of tiles compared to the unit
+        self.tile_divider = backend.number(1) #the fineness of tiles compared to the unit
         self.current_action = None
         #self.previous_tile = None
         self.current_tile = None
         self.expected_tile = None
+        self.expected_coords = None #any angle paths check the agent's position against this instead of the expected tile
+        self.path_obstructed = False #set by monitor_path when an enemy steps onto the path ahead, the next travel_to plans around it
+        self.segment_start = None #where the current any angle segment was planned from, tells which side of the doorway the agent started on
         self.previous_doorway = None #whenever we need to reroute our path, we'll use this value
         self.anterior_doorway = None #the doorway prior to previous_doorway, we'll be sitting on this doorway at some point
         self.crossing_doorway = False #there are certain places where this bool will override the current pathfinding to cross a doorway
+        self.expanded_nodes = 0 #how many nodes the last search expanded, useful for comparing search methods
+        self.incremental = incremental #repair the current segment's search with D* Lite when the path gets blocked instead of searching again (fresh segments use A*)
+        self.replanner = None #D* Lite search state for the current segment of the path
+        self.replanning = False #set by recalculate_path, keeps the tile bias for the next search and has it repair the segment with D* Lite
+        self.planned_base = None #the base occupancy the replanner last searched, if it's still current only the enemies need passing on
+        self.any_angle = any_angle #plan straight legs between waypoints with Lazy Theta* and walk them diagonally where that saves moves
+        self.turn_step = 45 #degrees a turn_left or turn_right rotates the agent
+        self.jump_points = jump_points #search with Jump Point Search instead (takes precedence over incremental), prunes the open parts of rooms
+        self.background_planning = background_planning #plan segments on a worker thread, travel_to returns 'nothing' until the plan is ready
+        self.planning = None #the PlanningThread, started with the first background plan
+        self.snapshots = [None, None] #two copies of the world state for the worker to plan against, written in turns
+        self.snapshot_index = 0 #which of the snapshots was written last
+        self.pending_plan = None #id of the segment plan being worked on in the background
+        self.plan_requests = 0 #ids handed out to background plans
+        self.hierarchical = hierarchical #route over doorways weighed with real moves and search each segment on its room's own grid, keeping the paths
+        self.room_paths = None #local grids and cached paths of every room, built in setup_map
+
+        if nav_map != None: #use a map some other navigator already built
+            self.walls_raw = nav_map.walls_raw if nav_map.walls_raw != None else []
+            self.adopt_map(nav_map)
 
         self.debugging = debugging #changes some behavior to either respect the agent's current location or the expected current location, plus other behavior
 
@@ -60,6 +120,7 @@ class Navigator():
     def __del__(self):
         if self.window != None:
             self.window.close()
+        self.stop_planning()
 
     def prepare_window(self):
         global sg
@@ -108,7 +169,7 @@ class Navigator():
                 self.window["_NEXT_"].update(disabled = True, button_color = ('black', '#555555'))
                 self.window["_OK_"].update(disabled = True, button_color = ('black', '#555555'))
             if values["_COORD_X_"] != "" and values["_COORD_Y_"] != "":
-                return Decimal(values["_COORD_X_"]), Decimal(values["_COORD_Y_"])
+                return backend.number(values["_COORD_X_"]), backend.number(values["_COORD_Y_"])
 
         return None
             
@@ -127,7 +188,7 @@ class Navigator():
             return 'This does not appear to be a vizdoom feature vector! Did you forget to set the correct domain in the agent config file?'
         else: #vizdoom feature vector
             self.feature_vector = feature_vector #not yet implemented
-            self.current_location = coord_tuple(Decimal(self.feature_vector["player"]["x_position"]), Decimal(self.feature_vector["player"]["y_position"]))
+            self.current_location = coord_tuple(backend.number(self.feature_vector["player"]["x_position"]), backend.number(self.feature_vector["player"]["y_position"]))
             self.angle = feature_vector["player"]["angle"]
             if self.tile_bias == None:
                 self.set_tile_bias(self.current_location)
@@ -137,14 +198,15 @@ class Navigator():
             #    for obstacle in self.feature_vector["items"]["obstacle"]:
             #        self.obstacles_old.add(coord_tuple(obstacle["x_position"], obstacle["y_position"]))
             if self.obstacles == []:
-                print(f"DEBUGGING, {self.feature_vector['items']}")
-                print(f"DEBUGGING, {self.feature_vector['items']['obstacle']}")
+                trace.agent.debug("items: %s", self.feature_vector["items"])
                 for obstacle in self.feature_vector["items"]["obstacle"]:
-                    print(f"DEBUGGING, {obstacle}")
+                    trace.agent.debug("obstacle: %s", obstacle)
                     self.obstacles.append(obstacle)
-            self.enemies = [] #needs to be updated every frame
-            for enemy in self.feature_vector["enemies"]:
-                self.enemies.append(enemy)
+                self.obstacle_store.refresh(self.obstacles)
+            self.enemies = self.feature_vector["enemies"] #needs to be updated every frame
+            self.enemy_store.refresh(self.enemies)
+            if len(self.path_tiles) > 0: #move the enemies' footprints now so monitor_path hears about the path being blocked before the next move
+                self.update_dynamic()
             return 'Updated the Navigator feature vector'
 
     def set_unit(self, unit):
@@ -180,7 +242,23 @@ class Navigator():
         '''
 
     #convert the raw wall coordinates into a full interpretation of the map with rooms and doorways
+    #shared and cached maps are keyed by the walls alone, which assumes the map is connected: discovering it from any spawn gives the same rooms
+    #a map that doesn't have the agent in one of its rooms (it was discovered from a part of the walls this spawn can't reach) is built again
     def setup_map(self): 
+        nav_map = NavMap.find(self.walls_raw)
+        if nav_map != None and self.contains_agent(nav_map): #another navigator in this process already built it
+            trace.map.info("sharing the map of another navigator, %d doorways and %d rooms", len(nav_map.doorways), len(nav_map.rooms))
+            self.adopt_map(nav_map)
+            return
+        if self.map_cache != False and load_map(self, self.map_cache): #this map has been processed before
+            nav_map = self.build_nav_map()
+            if self.contains_agent(nav_map):
+                trace.map.info("loaded %d doorways and %d rooms from the map cache", len(self.doorways), len(self.rooms))
+                self.adopt_map(nav_map.register())
+                return
+            trace.map.info("the cached map doesn't reach the agent at %s, building it again", self.current_location)
+            self.doorways, self.rooms, self.map_corners = set(), set(), {}
+
         self.walls = set() #reset all the walls
         
         #first generate the new Wall objects
@@ -192,12 +270,13 @@ class Navigator():
             else:
                 self.max_x = max(self.max_x, max(raw["x1"], raw["x2"]))
 
-        for a, b in itertools.combinations(self.walls, 2): #find all corners between the walls
+        for a, b in candidate_pairs(self.walls): #find all corners between the walls, only the pairs that could possibly touch
             check_intersection(a, b, enum.update_both)
+        self.line_index = SpatialHash(lines = self.walls) #doorways get added once they're known
 
         #set up agent ray
-        agent_wall = create_ray(self.current_location, self.max_x, self.walls)
-        print("DEBUGGING, AGENT LOCATION:", self.current_location)
+        agent_wall = create_ray(self.current_location, self.max_x, self.ray_candidates(self.current_location))
+        trace.map.debug("agent location: %s", self.current_location)
 
         #gather all corners that are part of the map and sort them into a dictionary
         raw_map_corners = discover_map(self.current_location, agent_wall)
@@ -230,7 +309,7 @@ class Navigator():
             for group in extended_walls:
                 #if check_intersection(cur, group[0], enum.update_none): #the walls are in the same 1d plane
                 if ((cur.s == enum.vertical and group[0].s == enum.vertical and cur.coords[0].x == group[0].coords[0].x) or
-                        cur.s != enum.vertical and cur.s == group[0].s and cur.b == group[0].b): #the walls are in the same 1d plane
+                        cur.s != enum.vertical and cur.s == group[0].s and backend.near(cur.b, group[0].b)): #the walls are in the same 1d plane
                     group.append(cur)
                     break
             else:
@@ -255,9 +334,10 @@ class Navigator():
                     self.doorways.add(new_door)
 
         #confirm that no two doorways intersect, and if so then delete both (but don't delete if they intersect at any of the two's endpoints)
-        for a, b in itertools.combinations(self.doorways, 2): #compare all two doorways
+        for a, b in candidate_pairs(self.doorways): #compare every two doorways that could touch
             inter = check_intersection(a, b)
             if (inter[0] == enum.intersection or inter[0] == enum.intersection_parallel) and not a.is_endpoint(inter[1]) and not b.is_endpoint(inter[1]): 
+                trace.geometry.debug("discarding crossing doorways %s and %s", a.coords, b.coords)
                 self.doorways.discard(a)
                 self.doorways.discard(b)
 
@@ -301,28 +381,50 @@ class Navigator():
 
         #during the discovering of the rooms, if a doorway is not discovered then discard it
         self.doorways = truncated_doorways
-        print(f"DEBUGGING, {len(self.doorways)} total doorways")
-        self.walls_to_tiles()
-        print(f"DEBUGGING, {len(self.rooms)} total rooms")
+        for doorway in self.doorways:
+            self.line_index.insert(doorway)
+        self.index_map(self.line_index)
+        trace.map.info("%d total doorways", len(self.doorways))
+        trace.map.info("%d total rooms", len(self.rooms))
+        if self.map_cache != False:
+            save_map(self, self.map_cache)
+
+    #package the processed map (walls, doorways, rooms and corners) into a NavMap other navigators can share, then use it
+    def index_map(self, line_index = None):
+        self.adopt_map(self.build_nav_map(line_index).register())
+
+    def build_nav_map(self, line_index = None):
+        return NavMap(self.walls, self.doorways, self.rooms, self.map_corners, self.max_x, self.walls_raw, line_index, self.unit, self.player_radius)
+
+    #was the map discovered from where the agent is, true when there's no location to check yet
+    def contains_agent(self, nav_map):
+        return self.current_location == None or nav_map.room_index.room_at(self.current_location.x, self.current_location.y) != None
+
+    #reference a NavMap's static map, everything this navigator builds on top of it (occupancy, caches, path state) stays its own
+    def adopt_map(self, nav_map):
+        self.nav_map = nav_map
+        self.walls, self.doorways, self.rooms, self.map_corners, self.max_x = nav_map.walls, nav_map.doorways, nav_map.rooms, nav_map.map_corners, nav_map.max_x
+        self.line_index, self.room_index, self.doorway_graph = nav_map.line_index, nav_map.room_index, nav_map.doorway_graph
+        self.room_paths = RoomPaths(self.line_index, self.player_radius)
+        self.wall_tiles = None
 
     #create a new set of actions, or return the action if already generated
     def travel_to(self, a = None, b = None):
 
         if self.window != None:
-            print("DEBUGGING, reading")
+            trace.agent.debug("reading")
             returned = self.get_window()
             if returned != None: #if we got a return value, set these as the coords
                 a = returned[0]
                 b = returned[1]
 
         if a != None and b == None:
-            destination = coord_tuple(Decimal(a[0]), Decimal(a[1]))
+            destination = coord_tuple(backend.number(a[0]), backend.number(a[1]))
         else:
-            destination = coord_tuple(Decimal(a), Decimal(b))
+            destination = coord_tuple(backend.number(a), backend.number(b))
 
         if self.crossing_doorway == True: #if crossing doorway, forget the normal process, just get over the doorway soon
-            print("DEBUGGING, CROSSING DOORWAY")
-            print(f"DEBUGGING1, length of path_actions: {len(self.path_actions)}")
+            trace.agent.debug("crossing doorway, %d actions left", len(self.path_actions))
             ret_action = self.path_actions.pop(0)
             ret_bool = True
             if len(self.path_actions) == 0: #once we're done crossing the doorway, then set the bool to false
@@ -332,18 +434,16 @@ class Navigator():
             return ret_action, ret_bool
 
         if (destination.x == None or destination.y == None) and self.destination == None: #not pathfinding and not given a new destination
-            print("DEBUGGING, not pathfinding and not given a new destination")
+            trace.agent.debug("not pathfinding and not given a new destination")
             return None, False
         if (destination.x != None and destination.y != None and self.destination != destination) or self.destination == None: #begin new pathfinding
-            print("DEBUGGING, begin new pathfinding")
+            if self.planning != None and self.planning.busy(): #an old plan is still being worked on, wait for the worker to let go of the planner's state
+                return dict({'action': 'nothing'}), True
+            trace.agent.info("begin new pathfinding to %s", destination)
             self.destination = destination
             self.access_tiles.clear() #empty out all blocked access tiles
             #self.previous_tile = self.current_tile if self.current_tile != None else self.to_tile(self.current_location)
-            print(f"DEBUGGING, DESTINATION: {destination}")
-            current_room = identify_room(create_ray(self.current_location, self.max_x, self.walls.union(self.doorways))) #identify current room
-            destination_room = identify_room(create_ray(self.destination, self.max_x, self.walls.union(self.doorways))) #identify destination room
-            self.path_rooms = self.pathfind_rooms(current_room, destination_room) #get list of rooms to pathfind through
-            self.path_doorways = self.pathfind_doorways(self.path_rooms) #get list of doorways to pathfind through
+            self.path_rooms, self.path_doorways = self.route(self.current_location, self.destination) #shortest list of rooms and the doorways between them
             self.path_rooms.insert(0, None) #padding at front so current room isn't popped
             self.path_doorways.append(None)
             self.path_actions = []
@@ -360,31 +460,42 @@ class Navigator():
             self.current_tile = self.to_tile(self.current_location) #remember the tile we're in currently after making the next action
 
         #continue with pathfinding to the already selected location
-        self.temporary_tiles = set() #reset these
         #self.access_tiles.clear()
-        for enemy in self.feature_vector["enemies"]:
-            self.temporary_tiles.add(coord_tuple(enemy["x_position"], enemy["y_position"]))
         if self.destination != None and self.reached_destination_tiles(self.current_tile, self.to_tile(self.destination)):
-                print("DEBUGGING, already on destination tile, so end pathfinding")
+                trace.agent.info("already on destination tile, so end pathfinding")
                 self.clear_pathfinding()
                 return dict({'action': 'nothing'}), False
+        if self.path_obstructed == True: #an enemy stepped onto the path ahead since the last call
+            self.path_obstructed = False
+            if len(self.path_actions) > 0 and self.crossing_doorway == False:
+                trace.agent.debug("the path ahead is blocked, planning around it")
+                self.recalculate_path() #the enemy is already in the planning occupancy, no access tile needed
         if len(self.path_actions) == 0: #current list of actions is empty
-            self.path_rooms.pop(0)
-            self.set_tile_bias(self.current_location)
-            if len(self.path_doorways) > 1: #pathfind to next doorway (if only delimiter is left then don't pathfind to it)
-                self.anterior_doorway = self.previous_doorway
-                self.previous_doorway = self.path_doorways.pop(0)
-                self.path_tiles, self.path_actions = self.pathfind(self.current_location, self.previous_doorway.midpoint())
-            else: #should be in the same room as the destination now, generate a path and pop the delimiter
-                print("DEBUGGING, should be in same room as the destination now")
-                self.path_doorways.pop()
-                self.path_tiles, self.path_actions = self.pathfind(self.current_location, self.destination)
+            if self.pending_plan == None: #start on the next segment
+                self.path_rooms.pop(0)
+                if self.replanning == False: #a fresh segment, line the tiles up with the agent again
+                    self.set_tile_bias(self.current_location)
+                if len(self.path_doorways) > 1: #pathfind to next doorway (if only delimiter is left then don't pathfind to it)
+                    self.anterior_doorway = self.previous_doorway
+                    self.previous_doorway = self.path_doorways.pop(0)
+                    plan = self.plan_segment(self.current_location, self.previous_doorway.midpoint())
+                else: #should be in the same room as the destination now, generate a path and pop the delimiter
+                    trace.agent.debug("should be in same room as the destination now")
+                    self.path_doorways.pop()
+                    plan = self.plan_segment(self.current_location, self.destination)
+                self.replanning = False #the search (or the snapshot given to the worker) has seen it
+            else: #the segment is being planned in the background
+                plan = self.collect_plan()
+            if plan == None: #not planned yet, stand still in the meantime
+                return dict({'action': 'nothing'}), True
+            self.path_tiles, self.path_actions = plan
+            self.path_obstructed = False #the new path was planned around the enemies as they are now
             #sometimes our list of actions is empty
             if self.path_tiles == None and self.path_actions == None:
-                print("DEBUGGING, NO PATH FOUND, PERHAPS COORDINATES ARE INVALID")
+                trace.agent.error("no path found, perhaps coordinates are invalid")
                 return dict({'action': 'nothing'}), False
             if len(self.path_tiles) == 0:
-                print("DEBUGGING, LIST OF ACTIONS WAS 0, TRYING TO RECALCULATE PATH")
+                trace.agent.debug("list of actions was 0, trying to recalculate path")
                 return dict({'action': 'nothing'}), True
             self.path_tiles.pop(0) #we are already on the first tile so we can pop it
         else:
@@ -393,14 +504,17 @@ class Navigator():
         if len(self.path_doorways) == 0 and len(self.path_actions) == 1: #exhausted all doorways and actions
             self.destination = None
 
+        if self.any_angle == True: #the path brings its own turns
+            return self.next_any_angle_action()
+
         #set up parameter for the next line
         #cur = self.to_tile(self.current_location) if self.debugging == False else self.current_tile
         if self.angle not in [0, 90, 180, 270]:
             return dict({'action': 'turn_right'}), True
         #if self.verify_action_old(cur, self.path_tiles[0], self.path_actions[0]) == True: #if immediate action is valid
-        if self.verify_action(self.current_location, self.path_tiles[0], self.path_actions[0], self.path_rooms[0]) == True: #if immediate action is valid
+        if self.tile_free(self.path_tiles[0]) == True: #if immediate action is valid
             current_action = self.path_actions.pop(0)
-            print(f"DEBUGGING, GETTING EXPECTED TILE, CURRENTLY LEN {len(self.path_tiles)}")
+            trace.agent.trace("getting expected tile, currently %d tiles", len(self.path_tiles))
             self.expected_tile = self.path_tiles.pop(0)
 
             if (self.window != None and self.reading == False and 
@@ -423,20 +537,18 @@ class Navigator():
                     direc += 2
                 elif diff_overall == 0: #if we're on the doorway perfectly, then just copy the last action
                     direc = current_action
-                print(f"DEBUGGING, STARTING THE CROSS_DOORWAY PROTOCOL")
+                trace.agent.debug("starting the cross doorway protocol")
                 temp_tile = self.adjacent_tile(self.to_tile(self.current_location), current_action, int(self.tile_divider)) #factor in current action
                 self.path_tiles.append(self.adjacent_tile(temp_tile, direc, 2 * int(self.tile_divider)))
                 self.expected_tile = self.path_tiles[0]
-                print(f"DEBUGGING, NEWLY EXPECTED TILE: {self.expected_tile}, {len(self.path_actions)}")
-                print(f"DEBUGGING, CURRENT TILE: {self.to_tile(self.current_location)}")
+                trace.agent.trace("newly expected tile: %s, %d actions", self.expected_tile, len(self.path_actions))
                 self.path_actions.append(self.true_action(direc)) #move two tiles in the direction of the doorway (will hopefully reach, then pass it onto the other side)
                 self.path_actions.append(self.true_action(direc))
-                print(f"DEBUGGING, length of path_actions: {len(self.path_actions)}")
 
                 
             #ret = (self.true_action(current_action), len(self.path_actions) > 0 or len(self.path_doorways) > 0)
             ret = (self.true_action(current_action), True)
-            print(f"DEBUGGING, returning action {ret}")
+            trace.agent.debug("returning action %s", ret)
             return ret
         else: #action is invalid and as such we need to generate a new path
             #self.destination = None #generate a new path
@@ -452,32 +564,80 @@ class Navigator():
             #ret = (self.true_action(self.travel_to(destination)), True)
             return dict({'action': 'nothing'}), True #we know there's more path to go, so we'll return True
 
+    #the next action of an any angle path, the counterpart of the tile by tile part of travel_to
+    def next_any_angle_action(self):
+        if len(self.path_actions) == 0: #nothing to walk in this segment, the next call moves on to the next one
+            return dict({'action': 'nothing'}), True
+        action = self.path_actions[0]
+        if type(action) != str and (action - self.angle) % 90 != 0: #a turn didn't go as planned, face a direction the move can be made from first
+            return dict({'action': self.turn_towards(action, self.angle)}), True
+        if type(action) != str: #check the moves up to the next turn in one go, something in the way now gets planned around
+            leg = 1
+            while leg < len(self.path_actions) and type(self.path_actions[leg]) != str:
+                leg += 1
+            blocked = np.flatnonzero(~self.coords_free([(float(c.x), float(c.y)) for c in self.path_coords[:leg]]))
+            if len(blocked) > 0: #blocking the tile makes sure the new plan doesn't walk the same leg again
+                self.recalculate_path(self.path_tiles[blocked[0]])
+                return dict({'action': 'nothing'}), True
+        self.path_actions.pop(0)
+        self.expected_tile = self.path_tiles.pop(0)
+        self.expected_coords = self.path_coords.pop(0)
+        if type(action) == str:
+            angle = (self.angle + (self.turn_step if action == 'turn_left' else -self.turn_step)) % 360
+            ret = dict({'action': action})
+        else:
+            angle = self.angle
+            ret = self.move_action(action, angle)
+
+        if (self.window != None and self.reading == False and
+                not (len(self.path_actions) > 0 or len(self.path_doorways) > 0)): #update the gui to allow reading again
+            self.allow_reading()
+
+        if len(self.path_actions) == 0 and self.previous_doorway != None and len(self.path_doorways) > 0: #finished the segment, cross the doorway
+            self.crossing_doorway = True
+            #head across the doorway, away from the side the segment started on (the last leg may already have reached the doorway or gone past it)
+            a, b = self.previous_doorway.coords
+            normal_x, normal_y = float(a.y) - float(b.y), float(b.x) - float(a.x)
+            if (float(self.segment_start.x) - float(a.x)) * normal_x + (float(self.segment_start.y) - float(a.y)) * normal_y > 0:
+                normal_x, normal_y = -normal_x, -normal_y
+            direc = 0 if abs(normal_x) > abs(normal_y) else 1
+            if (normal_x if direc == 0 else normal_y) < 0:
+                direc += 2
+            trace.agent.debug("starting the cross doorway protocol")
+            self.path_actions.append(self.move_action(direc * 90, angle)) #the segment ends facing along an axis, so these are plain moves
+            self.path_actions.append(self.move_action(direc * 90, angle))
+            step = 2 * self.unit
+            self.expected_coords = coord_tuple(self.expected_coords.x + step * (direc == 0) - step * (direc == 2),
+                self.expected_coords.y + step * (direc == 1) - step * (direc == 3)) #where the crossing should leave the agent
+            self.expected_tile = self.to_tile(self.expected_coords)
+        trace.agent.debug("returning action %s", ret)
+        return ret, True
+
     #confirm that the actual action played out as expected and if not we need to make adjustments, should be called after taking an action (right before next action)
     def review_action(self):
+        if self.pending_plan != None: #standing still while the next segment is planned
+            return True
         if self.crossing_doorway == True: #if crossing doorway, forget reviewing the action for now
             return True
         if self.current_tile == None: #if no previous move then just return True, everything is good so far (current_tile is the previous tile by now)
             return True
         
+        if self.any_angle == True and self.expected_coords != None: #diagonal moves don't land on tile centers, compare positions instead
+            if self.reached_destination_coords(self.current_location, self.expected_coords):
+                trace.agent.trace("reached expected coordinates correctly")
+                return True
+            trace.agent.debug("didn't reach expected coordinates %s (at %s), making adjustments", self.expected_coords, self.current_location)
+            self.recalculate_path(self.expected_tile)
+            return False
         if self.expected_tile == self.to_tile(self.current_location): #we reached the correct tile, no issue
-            print("DEBUGGING, reached expected tile correctly")
+            trace.agent.trace("reached expected tile correctly")
             return True
         else: #if we weren't able to reach the expected destination, then we need to create a new path
-            print("DEBUGGING, didn't reach expected tile, making adjustments")
-            print(f"DEBUGGING, expected tile: {self.expected_tile}")
-            print(f"DEBUGGING, actual tile: {self.to_tile(self.current_location)}")
+            trace.agent.debug("didn't reach expected tile %s (at %s), making adjustments", self.expected_tile, self.to_tile(self.current_location))
             self.recalculate_path(self.expected_tile)
             self.set_tile_bias(self.current_location) #reset the tile bias just in case this was the issue
             return False
 
-    #will ensure the expected move has no problems
-    def verify_action_old(self, from_tile, to_tile, action):
-        distance = abs(from_tile.x - to_tile.x) if (action == 0 or action == 2) else abs(from_tile.y - to_tile.y)
-        for i in range(1, int(distance) + 1): #check every tile to make sure there's nothing blocking
-            if self.adjacent_tile(from_tile, action, i) in self.blocked_tiles:
-                return False
-        return True
-
     def verify_action(self, current_coords: coord_tuple, new_coords: coord_tuple, action: int, room: Room):
         #for blocked in self.blocked_coords:
         #    if self.reached_destination(blocked, new_coords): #if this coord is close to any blocked location, return False
@@ -487,35 +647,31 @@ class Navigator():
         dist = abs(current_tile.x - new_tile.x) if (action == 0 or action == 2) else abs(current_tile.y - new_tile.y)
         for i in range(1, int(dist) + 1): #check every tile to make sure there's nothing blocking
             if self.adjacent_tile(current_tile, action, i) in self.access_tiles: #used to be blocked_tiles
-                print("DEBUGGING, FOUND IN ACCESS_TILES")
+                trace.planner.trace("found in access_tiles")
                 return False
         door_ret = None
-        for door in self.doorways: #TODO make these selfs into rooms
-            if door != self.previous_doorway and distance_to_line(new_coords, door) < 16: #collision with bad doorway
-                if door == self.anterior_doorway:
-                    print("DEBUGGING, COLLISION WITH ANTERIOR DOORWAY, NOT SURE HOW TO FIX THIS QUITE YET")
-                else:
-                    door_ret = False
-            #if door == self.previous_doorway and distance_to_line(new_coords, door) < 16: #collision with good doorway
-            #    print("DEBUGGING, COLLISION WITH GOOD DOORWAY")
-            #    return True
-        for wall in self.walls:
-            if distance_to_line(new_coords, wall) < 16: #collision with wall
+        for line in self.line_index.query(new_coords, 16): #only the walls and doorways sharing a bucket with new_coords can be close enough
+            if type(line) == Doorway:
+                if line != self.previous_doorway and distance_to_line(new_coords, line) < 16: #collision with bad doorway
+                    if line == self.anterior_doorway:
+                        trace.planner.trace("collision with anterior doorway, not sure how to fix this quite yet")
+                    else:
+                        door_ret = False
+            elif distance_to_line(new_coords, line) < 16: #collision with wall
                 door_ret = False
         if door_ret == False:
-            print("DEBUGGING, COLLISION WITH BAD DOORWAY OR WALL")
+            trace.planner.trace("collision with bad doorway or wall")
             return False
-        for enemy in self.enemies:
-            if distance(new_coords, coord_tuple(Decimal(enemy["x_position"]), Decimal(enemy["y_position"]))) < 20: #enemies are larger than people
-                print("DEBUGGING, COLLISION WITH ENEMY")
-                return False
-        for obstacle in self.obstacles:
-            if distance(new_coords, coord_tuple(Decimal(obstacle["x_position"]), Decimal(obstacle["y_position"]))) < 16:
-                print("DEBUGGING, COLLISION WITH OBSTACLE")
-                return False
-        print("DEBUGGING, NO ISSUE")
+        if self.entity_collisions([(float(new_coords.x), float(new_coords.y))])[0]:
+            trace.planner.trace("collision with enemy or obstacle")
+            return False
+        trace.planner.trace("no issue")
         return True
 
+    #for each of the (x, y) points, would the agent standing there run into an enemy or an obstacle, the whole batch is checked at once
+    def entity_collisions(self, points):
+        return self.enemy_store.within(points) | self.obstacle_store.within(points)
+
     #given an objective action, convert it into a true action for the agent to take
     def true_action(self, action):
         direction = (int(action) - int(self.angle) / 90 + 4) % 4
@@ -529,30 +685,158 @@ class Navigator():
             return dict({'action': 'right'})
         return direction
 
+    #the move that takes the agent towards heading (degrees) when it faces angle, heading has to be a multiple of 90 away from angle
+    def move_action(self, heading, angle = None):
+        angle = self.angle if angle == None else angle
+        return dict({'action': ('forward', 'left', 'backward', 'right')[round(((heading - angle) % 360) / 90) % 4]})
+
+    #the shorter way to turn from angle towards heading
+    def turn_towards(self, heading, angle):
+        return 'turn_left' if 0 < (heading - angle) % 360 <= 180 else 'turn_right'
+
+    #for each of the (x, y) points, can the agent stand there, checked against the geometry itself since any angle moves don't end on tile centers
+    #the whole batch (the rest of a leg, say) is checked at once against the lines near all of them, the access tiles and the entities
+    def coords_free(self, points):
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 2)
+        free = ~self.entity_collisions(points)
+        if len(self.access_tiles) > 0:
+            free &= np.array([(int(x), int(y)) not in self.access_tiles for x, y in self.to_tiles(points)], dtype = bool).reshape(-1)
+        low, high = points.min(axis = 0) - self.player_radius, points.max(axis = 0) + self.player_radius
+        near = ((self.nav_map.segment_low <= high) & (self.nav_map.segment_high >= low)).all(axis = 1)
+        for doorway in (self.previous_doorway, self.anterior_doorway): #the doorways the path goes through
+            if doorway != None:
+                near[self.nav_map.line_rows[doorway]] = False
+        if near.any():
+            free &= points_to_segments(points, self.nav_map.segments[near]).min(axis = 1) >= self.player_radius
+        return free
+
     @property
     def tile_size(self):
         return self.unit / self.tile_divider
 
     @property
-    def blocked_tiles(self): #TODO consider doorways either here or elsewhere to boost performance
+    def temporary_tiles(self): #constantly moving objects like enemies
+        if self.dynamic == None:
+            return set()
+        return set(coord_tuple(x, y) for x, y in self.dynamic.tiles(np.flatnonzero(self.dynamic.blocked)))
+
+    #nothing on a planning path reads this union, the searches check the OccupancyGrid, the DynamicLayer and access_tiles directly
+    @property
+    def blocked_tiles(self):
+        if self.wall_tiles == None:
+            self.walls_to_tiles()
         return self.wall_tiles.union(self.obstacles_old).union(self.temporary_tiles).union(self.access_tiles)
 
+    #the room the point is in, looked up in the room index, a point on no room's polygon (right on a wall, say) falls back to walking a ray
+    def room_at(self, x, y):
+        room = self.room_index.room_at(x, y) if self.room_index != None else None
+        if room == None:
+            coords = coord_tuple(backend.number(x), backend.number(y))
+            room = identify_room(create_ray(coords, self.max_x, self.ray_candidates(coords)))
+        return room
+
+    #the rooms of an (n, 2) array of points (the enemies' positions, say) in one pass over the room index, None for points outside every room
+    #update_features doesn't classify the enemies and items every frame, whatever needs their rooms calls this with the positions it has
+    def rooms_at(self, points):
+        return self.room_index.rooms_at(points)
+
+    #walls and doorways that a ray from coords towards max_x could run into, so rays don't have to be checked against the whole map
+    def ray_candidates(self, coords):
+        return self.line_index.query_segment(coords, (self.max_x, coords.y))
+
+    #walls and obstacles inflated by the player's radius for the current tile bias, only rebuilt when the bias (or the obstacles) change
+    def static_occupancy(self):
+        if (self.occupancy == None or not self.occupancy.matches(self.tile_bias, self.tile_size) or
+                self.occupancy.obstacle_count != len(self.obstacle_store)):
+            xs = [float(wall.coords[i].x) for wall in self.walls for i in range(2)]
+            ys = [float(wall.coords[i].y) for wall in self.walls for i in range(2)]
+            occupancy = OccupancyGrid(self.tile_bias, self.tile_size, (min(xs), min(ys), max(xs), max(ys)), margin = float(self.tile_size))
+            segments = segments_array(self.walls)
+            occupancy.stamp_segments(segments, self.player_radius)
+            occupancy.stamp_supercover(segments) #the tiles walls pass through, whatever the radius and tile size
+            occupancy.stamp_points(self.obstacle_store.positions(), self.player_radius)
+            occupancy.obstacle_count = len(self.obstacle_store)
+            self.doorway_cells = {doorway: occupancy.segment_cells(doorway.segment, self.player_radius) for doorway in self.doorways}
+            self.occupancy = occupancy
+        return self.occupancy
+
+    #the static occupancy plus the doorways we aren't heading through and access_tiles, only rebuilt when one of those changes
+    def base_occupancy(self):
+        static = self.static_occupancy()
+        key = (static, self.previous_doorway, self.anterior_doorway, frozenset(self.access_tiles))
+        if self.base_key != key:
+            occupancy = static.copy()
+            for doorway, cells in self.doorway_cells.items():
+                if doorway != self.previous_doorway and doorway != self.anterior_doorway:
+                    occupancy.block_cells(cells)
+            for tile in self.access_tiles:
+                occupancy.block(tile)
+            self.base, self.base_key = occupancy, key
+        return self.base
+
+    #move the enemies' footprints to where the enemies are now, a new layer is only needed when the tiles themselves change
+    def update_dynamic(self):
+        static = self.static_occupancy()
+        if self.dynamic == None or not self.dynamic.matches(static):
+            self.dynamic = DynamicLayer(static)
+            self.dynamic.subscribe(self.monitor_path)
+            if self.replanner != None:
+                self.dynamic.subscribe(self.replanner.cells_changed)
+        keys = [enemy.get("id", i) for i, enemy in enumerate(self.enemies)]
+        return self.dynamic.update(keys, self.enemy_store.positions(), self.enemy_radius)
+
+    #subscribed to the dynamic layer, flags the path when an enemy steps onto the rest of it so travel_to plans around the enemy straight away
+    def monitor_path(self, blocked, freed):
+        if self.crossing_doorway == True or len(self.path_actions) == 0:
+            return
+        ahead = set(self.path_tiles[:-1]).intersection(blocked) #the goal tile is allowed with an enemy on it, just like in the searches
+        if len(ahead) > 0:
+            trace.agent.debug("%d tiles of the path ahead were just blocked by enemies", len(ahead))
+            self.path_obstructed = True
+
+    #the base occupancy plus the enemies, everything a search has to avoid
+    def planning_occupancy(self):
+        self.update_dynamic()
+        occupancy = self.base_occupancy().copy()
+        occupancy.grid |= self.dynamic.blocked
+        return occupancy
+
+    #can the agent step onto this tile right now, a lookup into the base and dynamic layers without building the whole planning occupancy
+    def tile_free(self, tile):
+        self.update_dynamic()
+        return self.base_occupancy().is_free(tile) and not self.dynamic.is_blocked(tile)
+
+    #the tile bias and size as a key, rounded since positions (and so the bias) pick up rounding errors between segments
+    def tile_layout(self):
+        return (round(float(self.tile_bias.x), 3), round(float(self.tile_bias.y), 3), float(self.tile_size))
+
+    #bump the blocking version when tiles a search avoids were freed or the obstacles changed, either can open up a shorter path
+    #newly blocked access tiles don't need to, cached paths crossing one are turned down when they're looked up
+    def update_blocking_version(self):
+        state = (len(self.obstacle_store), frozenset(self.access_tiles))
+        if self.blocking_state == None or state[0] != self.blocking_state[0] or not state[1].issuperset(self.blocking_state[1]):
+            self.blocking_version += 1
+        self.blocking_state = state
+        return self.blocking_version
+
     #sets tile bias to align the tile plane with the agent (agent lands close to the center of a tile)
     def set_tile_bias(self, coords):
         def formula(coord):
-            return (coord + self.tile_size / 2) % self.tile_size
+            return backend.floor_mod(coord + self.tile_size / 2, self.tile_size)
         self.tile_bias = coord_tuple(formula(coords.x), formula(coords.y))
 
-    #converts true coordinates to tile coordinates, also eliminates -0 and converts to normal 0
+    #converts true coordinates to tile coordinates, as plain ints so the planners' sets and dicts hash and compare tiles natively
     def to_tile(self, coords):
-        a = (coords.x - self.tile_bias.x) // self.tile_size
-        b = (coords.y - self.tile_bias.y) // self.tile_size
-        if a == 0:
-            a = 0
-        if b == 0:
-            b = 0
+        a = backend.floor_div(coords.x - self.tile_bias.x, self.tile_size)
+        b = backend.floor_div(coords.y - self.tile_bias.y, self.tile_size)
         #return coord_tuple((coords.x - self.tile_bias.x) // self.tile_size, (coords.y - self.tile_bias.y) // self.tile_size)
-        return coord_tuple(Decimal(a), Decimal(b))
+        return coord_tuple(int(a), int(b))
+
+    #to_tile for an (n, 2) array of world coordinates at once, in float64 rather than the backend's numbers, gives an (n, 2) int64 array of tiles
+    def to_tiles(self, points):
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 2)
+        bias = np.array([float(self.tile_bias.x), float(self.tile_bias.y)])
+        return np.floor((points - bias) / float(self.tile_size)).astype(np.int64)
 
     #gives adjacent tiles in 'distance' away from the given tile, uses tile coordinates not real coordinates
     def adjacent_tile(self, tile, direction, distance = 1):
@@ -587,61 +871,430 @@ class Navigator():
         return distance(coord, destination_coord) < 8 #this is our leeway
 
     #converts walls into tiles so we can avoid them (not enemies nor barriers because those need to be recalculated often)
+    #every tile a wall passes through, rasterized for all the walls at once in the static occupancy's tile layout
     def walls_to_tiles(self):
-        converted = 0
-        tiles = set()
-        for line in self.walls:
-            converted += 1
-            newtiles = set()
-            if line.s == enum.vertical: #vertical line
-                y_start = min(line.coords[0].y, line.coords[1].y)
-                y_end = max(line.coords[0].y, line.coords[1].y)
-                length = int((y_end - y_start) // self.tile_size)
-                for i in range(length + 1):
-                    newtiles.add(self.to_tile(coord_tuple(line.coords[0].x, y_start + i * self.tile_size)))
-                if (y_end - y_start) > length:
-                    newtiles.add(self.to_tile(coord_tuple(line.coords[0].x, y_end)))
-            else: #diagonal or horizontal line
-                x_start = min(line.coords[0].x, line.coords[1].x)
-                x_end = max(line.coords[0].x, line.coords[1].x)
-                length = int((x_end - x_start) // self.tile_size)
-                for i in range(length + 1):
-                    newtiles.add(self.to_tile(coord_tuple(x_start + i * self.tile_size, line.equation(x = x_start + i * self.tile_size))))
-                if (x_end - x_start) > length:
-                    newtiles.add(self.to_tile(coord_tuple(x_end, line.equation(x = x_end))))
-            #if converted < 10:
-            #    print(f"DEBUGGING, line: {line.to_string()}, tiles: {newtiles}")
-            tiles = tiles.union(newtiles)
-
-        self.wall_tiles = tiles
+        tiles = self.static_occupancy().supercover(segments_array(self.walls))
+        self.wall_tiles = set(coord_tuple(int(x), int(y)) for x, y in tiles)
 
     #clear all information regarding pathfinding
     def clear_pathfinding(self):
         self.path_actions = []
         self.path_tiles = []
+        self.path_coords = []
         self.path_doorways = []
         self.path_rooms = []
         self.destination = None
+        self.expected_coords = None
+        self.path_obstructed = False
         self.crossing_doorway = False
         self.previous_doorway = None
         self.anterior_doorway = None
         self.current_tile = None
         self.current_action = None
         self.access_tiles = set()
+        self.drop_replanner()
+        self.replanning = False
+        self.pending_plan = None #a plan still being worked on is dropped once it's done
 
     #in case we need to recalculate a path, set up the paths to do so (which means resetting certain variables to what they were during the start of this room)
     def recalculate_path(self, blocked_tile = None):
         if blocked_tile != None:
             self.access_tiles.add(blocked_tile)
-            print(f"DEBUGGING, added to access_tiles: {blocked_tile}")
-            print(f"DEBUGGING, current_tile: {self.to_tile(self.current_location)}")
+            trace.agent.debug("added to access_tiles: %s", blocked_tile)
         self.path_doorways.insert(0, self.previous_doorway)
         self.path_actions.clear()
         self.path_rooms.insert(0, self.path_rooms[0])
+        self.replanning = True
         #self.previous_doorway = self.anterior_doorway
 
-    #find a set of instructions from current location to destination location, accept tile coordinates as parameters
+    #find a set of instructions from current location to destination location, returns the path's tiles and actions
+    #tile by tile paths come out of the path cache when the same segment was planned before against the same blocked tiles
     def pathfind(self, start_coords, destination_coords):
+        if self.any_angle == True: #these depend on the agent's angle and on where the enemies are, so they're always planned
+            return self.pathfind_any_angle(start_coords, destination_coords)
+        key = (self.to_tile(start_coords), self.to_tile(destination_coords), self.tile_layout(), self.previous_doorway, self.anterior_doorway)
+        version = self.update_blocking_version()
+        self.update_dynamic()
+        with self.cache_lock:
+            cached = self.path_cache.get(key, version, lambda path_tiles: not any(self.dynamic.is_blocked(tile) or tile in self.access_tiles for tile in path_tiles[1:]))
+        if cached != None:
+            trace.planner.debug("reusing a cached path of %d tiles, %d hits and %d misses", len(cached[0]), self.path_cache.hits, self.path_cache.misses)
+            return cached
+        path_tiles, path_actions = self.search(start_coords, destination_coords)
+        if path_tiles != None:
+            with self.cache_lock:
+                self.path_cache.put(key, version, path_tiles, path_actions)
+        return path_tiles, path_actions
+
+    #the rooms passed through from one point to another and the doorways between them, empty if there's no route
+    def route(self, start_coords, destination_coords):
+        current_room = self.room_at(start_coords.x, start_coords.y) #identify current room
+        destination_room = self.room_at(destination_coords.x, destination_coords.y) #identify destination room
+        if self.hierarchical == True and self.tile_divider == 1: #weigh the doorway graph with the moves inside each room
+            self.set_tile_bias(start_coords)
+            with self.cache_lock: #a background plan could be switching the room paths' layout
+                self.room_paths.set_layout(self.tile_bias, self.tile_size, self.obstacle_store)
+                weigh = lambda room, a, b: self.room_paths.distance(room, a, b, self.doorway_graph.midpoint)
+                return self.doorway_graph.route(current_room, start_coords, destination_room, destination_coords, weigh)
+        return self.doorway_graph.route(current_room, start_coords, destination_room, destination_coords)
+
+    #plan a whole journey up front, segment by segment the way travel_to does but without moving, then clear the pathfinding state
+    #returns the world coordinates of the tile centers along the way (the start included), None if the destination can't be reached
+    def plan_journey(self, start_coords, destination_coords):
+        self.clear_pathfinding()
+        rooms, doorways = self.route(start_coords, destination_coords)
+        if len(rooms) == 0:
+            return None
+        location = start_coords
+        ret = [(float(start_coords.x), float(start_coords.y))]
+        for i, room in enumerate(rooms):
+            self.path_rooms = [room]
+            self.set_tile_bias(location)
+            if i < len(doorways): #head for the next doorway, the one just crossed stays open
+                self.anterior_doorway, self.previous_doorway = self.previous_doorway, doorways[i]
+                path_tiles = self.pathfind(location, doorways[i].midpoint())[0]
+            else:
+                path_tiles = self.pathfind(location, destination_coords)[0]
+            if path_tiles == None:
+                self.clear_pathfinding()
+                return None
+            centers = [self.tile_center(tile) for tile in path_tiles[1:]]
+            ret += [(float(center.x), float(center.y)) for center in centers]
+            if len(centers) > 0: #the next segment lines its tiles up with this center, so they stay the same tiles
+                location = centers[-1]
+        self.clear_pathfinding()
+        return ret
+
+    #world coordinates of the center of a tile, where the agent stands on it
+    def tile_center(self, tile):
+        half = self.tile_size / 2
+        return coord_tuple(self.tile_bias.x + tile.x * self.tile_size + half, self.tile_bias.y + tile.y * self.tile_size + half)
+
+    #pathfind for a segment of the route, on the worker thread if background planning is on (returns None until the plan is collected)
+    def plan_segment(self, start_coords, destination_coords):
+        if self.background_planning == False:
+            return self.pathfind(start_coords, destination_coords)
+        if self.planning == None:
+            self.planning = PlanningThread()
+            self.planning.start()
+        self.plan_requests += 1
+        self.pending_plan = (self.plan_requests, start_coords, destination_coords)
+        self.update_blocking_version() #on this thread, the snapshot plans (and checks the path cache) at the version it's given
+        self.planning.submit(self.plan_requests, self.snapshot(), start_coords, destination_coords)
+        return self.collect_plan()
+
+    #swap a finished background plan in, None while it's still being planned
+    def collect_plan(self):
+        request_id, start_coords, destination_coords = self.pending_plan
+        result = self.planning.result(request_id)
+        if result == None:
+            return None
+        (path_tiles, path_actions), snapshot = result
+        self.pending_plan = None
+        self.drop_replanner()
+        if snapshot.replanner != None: #the D* Lite search comes back to this thread, whether it was repaired or started on the worker
+            if snapshot.dynamic != None:
+                snapshot.dynamic.unsubscribe(snapshot.replanner.cells_changed)
+            self.replanner, self.planned_base, snapshot.replanner = snapshot.replanner, None, None #the enemy layer here didn't follow the worker's, so the next repair compares the whole occupancy
+            if self.dynamic != None:
+                self.dynamic.subscribe(self.replanner.cells_changed)
+        if path_tiles != None and len(path_tiles) > 0 and self.to_tile(self.current_location) != path_tiles[0]: #the agent got moved while waiting
+            trace.planner.debug("agent moved while the plan was being made, planning again")
+            return self.plan_segment(self.current_location, destination_coords)
+        #whatever the search left on the snapshot that the path is followed with, and the occupancy it built so this thread doesn't build it again
+        self.path_coords, self.segment_start, self.expanded_nodes = snapshot.path_coords, snapshot.segment_start, snapshot.expanded_nodes
+        if snapshot.occupancy != None and snapshot.occupancy is not self.occupancy and snapshot.occupancy.matches(self.tile_bias, self.tile_size):
+            self.occupancy, self.doorway_cells = snapshot.occupancy, snapshot.doorway_cells
+        trace.planner.debug("collected background plan %d", request_id)
+        return path_tiles, path_actions
+
+    #copy what a search reads into the snapshot the worker isn't using, the two are written in turns so neither thread sees the other's writes
+    #everything is taken from the navigator or copied where the frame loop changes it, the path cache and room paths stay shared under cache_lock
+    #the D* Lite search goes with the snapshot until collect_plan hands it back, listening to the snapshot's copy of the enemy layer meanwhile
+    def snapshot(self):
+        self.snapshot_index = 1 - self.snapshot_index
+        snapshot = self.snapshots[self.snapshot_index]
+        if snapshot == None:
+            snapshot = self.snapshots[self.snapshot_index] = object.__new__(Navigator)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.window, snapshot.reading = None, False
+        snapshot.planning, snapshot.snapshots, snapshot.background_planning = None, [None, None], False
+        snapshot.dynamic = self.dynamic.copy() if self.dynamic != None else None #where the enemies were when the search last heard of them
+        if self.replanner != None:
+            if self.dynamic != None:
+                self.dynamic.unsubscribe(self.replanner.cells_changed)
+            if snapshot.dynamic != None:
+                snapshot.dynamic.subscribe(self.replanner.cells_changed)
+            self.replanner = None
+        snapshot.access_tiles = set(self.access_tiles)
+        snapshot.path_rooms, snapshot.path_doorways = list(self.path_rooms), list(self.path_doorways)
+        snapshot.enemies = list(self.enemies)
+        snapshot.enemy_store, snapshot.obstacle_store = self.enemy_store.copy(), self.obstacle_store.copy()
+        return snapshot
+
+    #stop the worker thread, background planning starts a new one if it's needed again
+    def stop_planning(self):
+        if self.__dict__.get("planning") != None:
+            self.planning.stop()
+            self.planning = None
+            self.pending_plan = None
+
+    #plan with whichever search the navigator was set up with
+    def search(self, start_coords, destination_coords):
+        if self.hierarchical == True and self.tile_divider == 1:
+            ret = self.pathfind_hierarchical(start_coords, destination_coords)
+            if ret[0] != None:
+                return ret
+        if self.jump_points == True and self.tile_divider == 1: #jumps are made of single tile moves
+            return self.pathfind_jump_points(start_coords, destination_coords)
+        if self.incremental == True and self.replanning == True and self.tile_divider == 1: #D* Lite moves one tile at a time
+            return self.pathfind_incremental(start_coords, destination_coords)
+        self.drop_replanner() #a fresh segment, a D* Lite search costs more than A* until there's something to repair
+        return self.pathfind_astar(start_coords, destination_coords)
+
+    #forget the D* Lite search, the first repair of the next segment starts a new one
+    def drop_replanner(self):
+        if self.replanner != None and self.dynamic != None:
+            self.dynamic.unsubscribe(self.replanner.cells_changed)
+        self.replanner = None
+
+    #pathfind with D* Lite, carrying the search over from the last call when it was for the same destination tile and tile layout
+    def pathfind_incremental(self, start_coords, destination_coords):
+        start_tile = self.to_tile(start_coords)
+        destination_tile = self.to_tile(destination_coords)
+        start, goal = tuple(start_tile), tuple(destination_tile)
+        occupancy = self.planning_occupancy()
+        if self.replanner == None or self.replanner.goal != goal or not self.replanner.compatible(occupancy):
+            if self.replanner != None:
+                self.dynamic.unsubscribe(self.replanner.cells_changed)
+            self.replanner = DStarLite(occupancy, start, goal)
+            self.dynamic.subscribe(self.replanner.cells_changed) #enemies moving are passed on as they happen instead of diffing the grids
+            trace.planner.debug("new D* Lite search from %s to %s", start, goal)
+        else:
+            self.replanner.move_start(start)
+            if self.planned_base is self.base: #only the enemies moved since the last search, the layer already said where
+                changed = self.replanner.update(occupancy, self.replanner.pending)
+            else:
+                changed = self.replanner.update(occupancy)
+            trace.planner.debug("repairing D* Lite search from %s to %s, %d tiles changed", start, goal, changed)
+        self.planned_base = self.base
+        path = self.replanner.plan()
+        self.expanded_nodes = self.replanner.expanded_nodes
+        if path == None:
+            trace.planner.error("no path found to destination after expanding %d nodes (maybe the agent isn't in the room it expects to be in?)", self.expanded_nodes)
+            return None, None
+        trace.planner.debug("pathfinded to destination, expanded %d nodes", self.expanded_nodes)
+        path_tiles = [coord_tuple(x, y) for x, y in path]
+        path_actions = [self.tile_action(a, b) for a, b in zip(path, path[1:])]
+        return path_tiles, path_actions
+
+    #pathfind with Lazy Theta*, the waypoints it finds are turned into turns and moves (diagonal ones too) by waypoint_actions
+    def pathfind_any_angle(self, start_coords, destination_coords):
+        start_tile = self.to_tile(start_coords)
+        destination_tile = self.to_tile(destination_coords)
+        start, goal = tuple(start_tile), tuple(destination_tile)
+        closed = [doorway for doorway in self.doorways if doorway != self.previous_doorway and doorway != self.anterior_doorway]
+        segments = np.vstack((segments_array(self.walls), segments_array(closed)))
+        enemies, obstacles = self.enemy_store.positions(), self.obstacle_store.positions()
+        access = np.array(list(self.access_tiles), dtype = np.float64).reshape(-1, 2)
+        access = (access + 0.5) * float(self.tile_size) + np.array([float(self.tile_bias.x), float(self.tile_bias.y)]) #centers of the access tiles
+        circles = np.vstack((
+            np.column_stack((enemies, np.full(len(enemies), float(self.enemy_radius)))),
+            np.column_stack((obstacles, np.full(len(obstacles), float(self.player_radius)))),
+            np.column_stack((access, np.full(len(access), float(self.tile_size) / math.sqrt(2)))))) #covers the whole tile
+        planner = LazyThetaStar(self.planning_occupancy(), segments, circles, self.player_radius)
+        waypoints = planner.plan(start, goal)
+        self.expanded_nodes = planner.expanded_nodes
+        if waypoints == None:
+            trace.planner.error("no path found to destination after expanding %d nodes (maybe the agent isn't in the room it expects to be in?)", self.expanded_nodes)
+            return None, None
+        trace.planner.debug("pathfinded to destination with %d waypoints, expanded %d nodes and checked line of sight %d times",
+            len(waypoints), self.expanded_nodes, planner.sight_checks)
+        coords, actions = self.waypoint_actions(start_coords, self.angle, [planner.center(tile) for tile in waypoints[1:]],
+            align = len(self.path_doorways) > 0, clear = planner.clear)
+        self.path_coords = [coord_tuple(backend.number(x), backend.number(y)) for x, y in coords]
+        self.segment_start = start_coords
+        return [start_tile] + [coord_tuple(int(x), int(y)) for x, y in self.to_tiles(coords)], actions
+
+    '''
+    Turn a list of waypoints into actions, moves are headings in degrees (converted by move_action once the agent's angle is known) and turns are
+    'turn_left' or 'turn_right'. Each leg is walked as a run of diagonal moves and a run of axis moves, whichever run the agent is already
+    facing the right way for comes first so a leg costs at most two turns. align ends the path facing along an axis, for crossing doorways.
+    A leg is strafed along the axes instead when that takes fewer frames and clear (given a polyline) allows it.
+    Returns where the agent should be after each action, and the actions.
+    '''
+    def waypoint_actions(self, start_coords, angle, waypoints, align = False, clear = None):
+        unit = float(self.unit)
+        step = unit / math.sqrt(2) #how far a diagonal move goes along each axis
+        x, y = float(start_coords.x), float(start_coords.y)
+        angle = int(angle) % 360
+        coords, actions = [], []
+        def turn(heading):
+            nonlocal angle
+            action = self.turn_towards(heading, angle)
+            angle = (angle + (self.turn_step if action == 'turn_left' else -self.turn_step)) % 360
+            actions.append(action)
+            coords.append((x, y))
+        for wx, wy in waypoints:
+            dx, dy = wx - x, wy - y
+            diagonals = round(min(abs(dx), abs(dy)) / step)
+            straights = max(0, round((max(abs(dx), abs(dy)) - diagonals * step) / unit))
+            diagonal_heading = math.degrees(math.atan2(math.copysign(1, dy), math.copysign(1, dx))) % 360
+            straight_heading = (0 if dx > 0 else 180) if abs(dx) >= abs(dy) else (90 if dy > 0 else 270)
+            runs = [(diagonal_heading, diagonals), (straight_heading, straights)]
+            if angle % 90 == 0: #facing along an axis, the axis run needs no turn
+                runs.reverse()
+            axis_runs = [(0 if dx > 0 else 180, round(abs(dx) / unit)), (90 if dy > 0 else 270, round(abs(dy) / unit))] #strafing, no diagonals
+            def frames(runs): #moves plus the turns needed to face the right way for each run
+                facing, ret = angle, 0
+                for heading, count in runs:
+                    if count > 0:
+                        ret += count + ((heading - facing) % 90 != 0)
+                        facing = heading
+                return ret
+            corner = (x + math.copysign(axis_runs[0][1] * unit, dx), y)
+            if frames(axis_runs) <= frames(runs) and (clear == None or clear(((x, y), corner, (wx, wy)))): #short sidesteps aren't worth turning for
+                runs = axis_runs
+            for heading, count in runs:
+                if count == 0:
+                    continue
+                while (heading - angle) % 90 != 0:
+                    turn(heading)
+                for _ in range(count):
+                    x += unit * round(math.cos(math.radians(heading)), 12)
+                    y += unit * round(math.sin(math.radians(heading)), 12)
+                    actions.append(heading)
+                    coords.append((x, y))
+        if align == True and angle % 90 != 0:
+            turn(angle + 45)
+        return coords, actions
+
+    #pathfind with Jump Point Search, the same moves and occupancy as pathfind_astar with far fewer tiles going through the heap
+    def pathfind_jump_points(self, start_coords, destination_coords):
+        start_tile = self.to_tile(start_coords)
+        destination_tile = self.to_tile(destination_coords)
+        start, goal = tuple(start_tile), tuple(destination_tile)
+        search = JumpPointSearch(self.planning_occupancy())
+        path = search.plan(start, goal)
+        self.expanded_nodes = search.expanded_nodes
+        if path == None:
+            trace.planner.error("no path found to destination after expanding %d jump points (maybe the agent isn't in the room it expects to be in?)", self.expanded_nodes)
+            return None, None
+        trace.planner.debug("pathfinded to destination, expanded %d jump points", self.expanded_nodes)
+        path_tiles = [coord_tuple(x, y) for x, y in path]
+        path_actions = [self.tile_action(a, b) for a, b in zip(path, path[1:])]
+        return path_tiles, path_actions
+
+    #search only the grid of the room the agent is in, reusing the path from the last time this segment was walked when nothing is in the way
+    #returns None, None if the room's grid doesn't get there (pathfind falls back to the whole map then)
+    def pathfind_hierarchical(self, start_coords, destination_coords):
+        room = self.path_rooms[0] if len(self.path_rooms) > 0 else None
+        if room == None:
+            room = self.room_at(start_coords.x, start_coords.y)
+        if room == None:
+            return None, None
+        open_doorways = frozenset(doorway for doorway in (self.previous_doorway, self.anterior_doorway) if doorway != None)
+        start_tile = self.to_tile(start_coords)
+        destination_tile = self.to_tile(destination_coords)
+        start, goal = tuple(start_tile), tuple(destination_tile)
+
+        with self.cache_lock: #the room paths are shared with background planning snapshots
+            self.room_paths.set_layout(self.tile_bias, self.tile_size, self.obstacle_store)
+            path = self.room_paths.path(room, open_doorways, start, goal)
+            #enemies and access tiles only ever make paths longer, so the room's path is still a shortest one if none of it is blocked
+            if path != None and not all(self.tile_free(tile) for tile in path[1:-1]):
+                grid = self.room_paths.grid(room, open_doorways)
+                occupancy = grid.copy()
+                offset_x, offset_y = grid.origin_x - self.dynamic.occupancy.origin_x, grid.origin_y - self.dynamic.occupancy.origin_y
+                low_x, low_y = max(offset_x, 0), max(offset_y, 0)
+                high_x, high_y = max(offset_x + grid.grid.shape[0], 0), max(offset_y + grid.grid.shape[1], 0)
+                i, j = np.nonzero(self.dynamic.blocked[low_x:high_x, low_y:high_y])
+                occupancy.grid[i + low_x - offset_x, j + low_y - offset_y] = True
+                for tile in self.access_tiles:
+                    occupancy.block(tile)
+                path = self.room_paths.path(room, open_doorways, start, goal, occupancy)
+            self.expanded_nodes = self.room_paths.expanded_nodes
+        if path == None:
+            trace.planner.debug("no path inside the room's grid, searching the whole map")
+            return None, None
+        trace.planner.debug("pathfinded inside the room, %d paths kept, %d hits and %d misses", len(self.room_paths), self.room_paths.hits, self.room_paths.misses)
+        path_tiles = [coord_tuple(x, y) for x, y in path]
+        path_actions = [self.tile_action(a, b) for a, b in zip(path, path[1:])]
+        return path_tiles, path_actions
+
+    #the action that moves the agent from one tile to the next
+    def tile_action(self, tile, next_tile):
+        dx, dy = next_tile[0] - tile[0], next_tile[1] - tile[1]
+        if dx > 0:
+            return 0
+        elif dy > 0:
+            return 1
+        elif dx < 0:
+            return 2
+        else:
+            return 3
+
+    #A* search from the current location to the destination location, returns the path's tiles and actions
+    def pathfind_astar(self, start_coords, destination_coords):
+        start_tile = self.to_tile(start_coords)
+        destination_tile = self.to_tile(destination_coords)
+        counter = itertools.count() #tie breaker so the heap never has to compare tiles
+        frontier = [(self.pathfind_heuristic(start_tile, destination_tile), next(counter), start_tile, start_coords)] #heap of (f, tie breaker, tile, coords)
+        costs = {start_tile: 0} #cheapest known number of moves to each tile
+        parents = {start_tile: None} #tile -> (previous tile, action taken from it), used to rebuild the path at the end
+        closed = set() #tiles that have already been expanded
+        rejected = set() #tiles that failed verification, the breadth-first search never retried these either
+        occupancy = self.planning_occupancy() #every collision check in the loop below is a lookup into this
+        self.expanded_nodes = 0
+        trace.planner.debug("start_tile: %s, destination_tile: %s", start_tile, destination_tile)
+        while len(frontier) > 0:
+            tile, coord = heapq.heappop(frontier)[2:]
+            if tile in closed: #stale heap entry, a cheaper one was already expanded
+                continue
+            closed.add(tile)
+            self.expanded_nodes += 1
+            for new_coord, action in self.adjacent_coords(coord): #for every adjacent coordinate the agent can be at
+                new_tile = self.to_tile(new_coord)
+                if new_tile in closed or new_tile in rejected:
+                    continue
+                new_cost = costs[tile] + 1
+                if new_cost >= costs.get(new_tile, math.inf): #already reachable at least as cheaply
+                    continue
+                if (self.reached_destination_tiles(new_tile, destination_tile) or
+                        self.reached_destination_coords(new_coord, destination_coords)): #if we reached the destination
+                    parents[new_tile] = (tile, action)
+                    trace.planner.debug("pathfinded to destination, expanded %d nodes", self.expanded_nodes)
+                    return self.reconstruct_path(parents, new_tile)
+                if not occupancy.is_free(new_tile): #this move is not valid
+                    rejected.add(new_tile)
+                    continue
+                costs[new_tile] = new_cost
+                parents[new_tile] = (tile, action)
+                heapq.heappush(frontier, (new_cost + self.pathfind_heuristic(new_tile, destination_tile), next(counter), new_tile, new_coord))
+        trace.planner.error("no path found to destination after expanding %d nodes (maybe the agent isn't in the room it expects to be in?)", self.expanded_nodes)
+        return None, None
+
+    #admissible estimate of the moves left, manhattan distance in tiles minus the leeway of reached_destination_tiles
+    def pathfind_heuristic(self, tile, destination_tile):
+        divider = float(self.tile_divider) #tiles are ints, keep the whole estimate in native numbers too
+        dist_x = max(abs(tile.x - destination_tile.x) - divider / 2, 0)
+        dist_y = max(abs(tile.y - destination_tile.y) - divider / 2, 0)
+        return (dist_x + dist_y) / divider #a single move covers at most tile_divider tiles
+
+    #follow the parent pointers back from the final tile to rebuild the path in the same format as the breadth-first search
+    def reconstruct_path(self, parents, tile):
+        path_tiles = [tile]
+        path_actions = []
+        while parents[tile] != None:
+            tile, action = parents[tile]
+            path_tiles.append(tile)
+            path_actions.append(action)
+        path_tiles.reverse()
+        path_actions.reverse()
+        return path_tiles, path_actions
+
+    #the original breadth-first search, kept around so its expansions can be compared against pathfind
+    def pathfind_bfs(self, start_coords, destination_coords):
         '''
         if a != None and b == None:
             destination = coord_tuple(a[0], a[1])
@@ -655,17 +1308,17 @@ class Navigator():
         frontier_tiles = [[self.to_tile(start_coords)]] #stores the tiles leading to the frontier
         frontier_actions = [[]] #stores the actions leading to the frontier
         visited = {self.to_tile(start_coords)} #stores all tiles we've visited to ensure there's no overlapping paths
-        print(f"DEBUGGING, start_tile: {self.to_tile(start_coords)}")
-        print(f"DEBUGGING, destination_tile: {destination_tile}")
-        print("DEBUGGING &&&&&&&&&&&&&&&& find a path to destination &&&&&&&&&&&&&&&&&&&&&&&&&&&")
+        self.expanded_nodes = 0
+        trace.planner.debug("start_tile: %s, destination_tile: %s", self.to_tile(start_coords), destination_tile)
         while (len(frontier_tiles) > 0):
-            print(f"DEBUGGING, length of frontier: {len(frontier_coords)}")
+            trace.planner.trace("length of frontier: %d", len(frontier_coords))
+            self.expanded_nodes += 1
             #for tile, action in self.adjacent_tiles(frontier_tiles[0][-1], self.tile_divider):
             for coord, action in self.adjacent_coords(frontier_coords[0][-1]): #for every adjacent coordinate the agent can be at
                 tile = self.to_tile(coord)
-                print(f"DEBUGGING, handling: {tile}")
+                trace.planner.trace("handling: %s", tile)
                 if tile not in visited: #we haven't visited this tile yet
-                    print("DEBUGGING, haven't visited")
+                    trace.planner.trace("haven't visited")
                     new_path_coords = frontier_coords[0].copy()
                     new_path_coords.append(coord)
                     new_path_tiles = frontier_tiles[0].copy()
@@ -674,45 +1327,41 @@ class Navigator():
                     new_path_actions.append(action)
                     if (self.reached_destination_tiles(tile, destination_tile) or 
                             self.reached_destination_coords(coord, destination_coords)): #if we reached the destination
-                        print("DEBUGGING, pathfinded to destination")
+                        trace.planner.debug("pathfinded to destination, expanded %d nodes", self.expanded_nodes)
                         return new_path_tiles, new_path_actions
                     else: #if this isn't the destination tile, want to perform a check so there's no collisions with walls
                         visited.add(tile)
                         #if self.verify_action_old(frontier_tiles[0][-1], tile, action) == True: #confirmed that this move is valid
                         if self.verify_action(frontier_coords[0][-1], coord, action, self.path_rooms[0]) == True: #confirmed that this move is valid
-                            print("DEBUGGING, PASSED verification")
+                            trace.planner.trace("passed verification")
                             frontier_coords.append(new_path_coords)
                             frontier_tiles.append(new_path_tiles)
                             frontier_actions.append(new_path_actions)
                         else: #this move is not valid
-                            print("DEBUGGING, FAILED verification")
+                            trace.planner.trace("failed verification")
                             pass
 
                 else: #already visited this tile
-                    print("DEBUGGING, have visited")
+                    trace.planner.trace("have visited")
                     pass
             frontier_coords.pop(0)
             frontier_tiles.pop(0)
             frontier_actions.pop(0)
-        print("DEBUGGING, NO PATH FOUND TO DESTINATION (maybe the agent isn't in the room it expects to be in?)")
+        trace.planner.error("no path found to destination (maybe the agent isn't in the room it expects to be in?)")
         return None, None
 
     def pathfind_doorways(self, path_rooms):
         if path_rooms == []:
-            print("DEBUGGING, NO PATH_ROOMS, COULD MEAN ALREADY IN THE RIGHT ROOM")
+            trace.planner.debug("no path_rooms, could mean already in the right room")
             return []
         ret = []
         for i in range(len(path_rooms) - 1):
-            room = path_rooms[i]
-            for doorway in room.doorways:
-                if room.adjacent_room(doorway) == path_rooms[i + 1]:
-                    ret.append(doorway)
+            ret.append(self.doorway_graph.shared_doorway(path_rooms[i], path_rooms[i + 1]))
         return ret
 
-    #find a set of rooms from starting room to destination room
+    #find the set of rooms from starting room to destination room passing through the fewest rooms, travel_to routes with doorway_graph instead
     def pathfind_rooms(self, start_room, destination_room):
-        print(f"DEBUGGING, start_room: {start_room}")
-        print(f"DEBUGGING, destination_room: {destination_room}")
+        trace.planner.debug("start_room: %s, destination_room: %s", start_room, destination_room)
         if start_room == destination_room:
             return [destination_room]
         frontier = [[start_room]] #where we grab the next path from, where we store the different paths
@@ -754,12 +1403,12 @@ def discover_map(start_location, ray, direction = 1, side = 1, rotation = 1):
 
 #function to circle around the interior of a room, given a point on a doorway (ideally midpoint)
 def discover_room(start_location, initial_doorway, room, direction = 1, side = 1, rotation = 1):
-    print(f"DEBUGGING, CURRENTLY DISCOVERING ROOM, direction = {direction}, side = {side}, rotation = {rotation}")
-    print(f"DEBUGGING, INITIAL {initial_doorway.coords}")
+    trace.map.debug("currently discovering room, direction = %s, side = %s, rotation = %s, initial %s", direction, side, rotation, initial_doorway.coords)
     doorways = set()
     room.doorways.add(initial_doorway)
     cur_corner = initial_doorway.next_corner_doorways(direction, side, rotation, start_location) #end of doorway
     cur_pointer = cur_corner[0] #this should be a wall object
+    room.corners.append(cur_corner[4])
     while cur_pointer != initial_doorway:
         if type(cur_pointer) == Doorway:
             room.doorways.add(cur_pointer)
@@ -773,6 +1422,7 @@ def discover_room(start_location, initial_doorway, room, direction = 1, side = 1
             room.walls.add(cur_pointer)
         cur_corner = cur_pointer.next_corner_doorways(cur_corner[1], cur_corner[2], cur_corner[3], cur_corner[4])
         cur_pointer = cur_corner[0]
+        room.corners.append(cur_corner[4]) #the last one is the initial doorway's other end
     return room, doorways
 
 #used to find what room the ray is inside
@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import math
+import numpy as np
+from skills.geometry import segment_distances
+
+SQRT2 = math.sqrt(2)
+
+#how many moves it takes to cover dx, dy tiles when every move is one tile long along an axis or a diagonal
+def octile(dx, dy):
+    dx, dy = abs(dx), abs(dy)
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+class LazyThetaStar:
+    '''
+    Lazy Theta* over the tiles of an OccupancyGrid, 8-connected, returning waypoints instead of every tile along the way.
+    A tile's parent can be any earlier tile it has line of sight to, so a path across an open room is a single leg instead of a staircase of moves.
+    The agent can only move along the axes and diagonals, so a leg is walked as a diagonal run and an axis run (in either order),
+    line of sight means both of those polylines keep the agent's clearance from the walls and stay out of the circles.
+    Costs are in moves (octile distance), which is what the agent pays in frames apart from the turns.
+    Tiles are (x, y) integer tuples in the same tile coordinates as Navigator.to_tile.
+    '''
+
+    def __init__(self, occupancy, segments, circles, clearance):
+        self.occupancy = occupancy
+        self.segments = segments #(n, 4) walls and closed doorways, the agent's center has to stay clearance away from them
+        self.low = np.minimum(segments[:, 0:2], segments[:, 2:4]) #bounding boxes, so a leg is only measured against the walls near it
+        self.high = np.maximum(segments[:, 0:2], segments[:, 2:4])
+        self.points = np.column_stack((circles[:, 0], circles[:, 1], circles[:, 0], circles[:, 1])) #(m, 4) the circles as zero length segments
+        self.radii = circles[:, 2]
+        self.clearance = clearance
+        self.goal = None
+        self.expanded_nodes = 0 #expansions done by the last plan call
+        self.sight_checks = 0 #line of sight checks done by the last plan call
+
+    #world coordinates of a tile's center, where the agent stands when on that tile
+    def center(self, tile):
+        return (self.occupancy.bias_x + (tile[0] + 0.5) * self.occupancy.size, self.occupancy.bias_y + (tile[1] + 0.5) * self.occupancy.size)
+
+    #the goal is always allowed, just like the goal check happens before the collision check in Navigator.pathfind_astar
+    def free(self, tile):
+        return tile == self.goal or self.occupancy.is_free(tile)
+
+    #tiles reachable in one grid move, diagonals can't cut past a blocked tile
+    def neighbours(self, tile):
+        x, y = tile
+        ret = []
+        for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+            if self.free((x + dx, y + dy)):
+                ret.append((x + dx, y + dy))
+        for dx, dy in ((1, 1), (-1, 1), (-1, -1), (1, -1)):
+            if self.free((x + dx, y + dy)) and self.free((x + dx, y)) and self.free((x, y + dy)):
+                ret.append((x + dx, y + dy))
+        return ret
+
+    def cost(self, a, b):
+        return octile(b[0] - a[0], b[1] - a[1])
+
+    #does every segment of the polyline (a list of world coordinates) keep the agent clear of the walls and the circles
+    def clear(self, polyline):
+        legs = np.array([(a[0], a[1], b[0], b[1]) for a, b in zip(polyline, polyline[1:])], dtype = np.float64).reshape(-1, 4)
+        low = np.minimum(legs[:, 0:2], legs[:, 2:4]).min(axis = 0) - self.clearance
+        high = np.maximum(legs[:, 0:2], legs[:, 2:4]).max(axis = 0) + self.clearance
+        near = self.segments[((self.low <= high) & (self.high >= low)).all(axis = 1)]
+        if len(near) > 0 and segment_distances(legs, near).min() < self.clearance:
+            return False
+        if len(self.points) > 0 and (segment_distances(legs, self.points) < self.radii[None, :]).any():
+            return False
+        return True
+
+    #can the agent walk from tile a to tile b in a straight leg, whichever order it takes the diagonal and the axis part in
+    def visible(self, a, b):
+        self.sight_checks += 1
+        ax, ay = self.center(a)
+        bx, by = self.center(b)
+        dx, dy = bx - ax, by - ay
+        minor = min(abs(dx), abs(dy))
+        diagonal = (math.copysign(minor, dx), math.copysign(minor, dy))
+        return (self.clear(((ax, ay), (ax + diagonal[0], ay + diagonal[1]), (bx, by))) and #diagonal part first
+            self.clear(((ax, ay), (bx - diagonal[0], by - diagonal[1]), (bx, by)))) #axis part first
+
+    #returns the list of waypoint tiles from start to goal (both included), None if the goal can't be reached
+    def plan(self, start, goal):
+        self.goal = goal
+        self.expanded_nodes = 0
+        self.sight_checks = 0
+        counter = itertools.count()
+        g = {start: 0}
+        parents = {start: start}
+        closed = set()
+        frontier = [(self.cost(start, goal), next(counter), start)]
+        while len(frontier) > 0:
+            tile = heapq.heappop(frontier)[2]
+            if tile in closed: #stale heap entry
+                continue
+            parent = parents[tile]
+            if parent != tile and not self.visible(parent, tile): #the lazy part, fall back to the best grid move from an expanded neighbour
+                options = [(g[neighbour] + self.cost(neighbour, tile), neighbour) for neighbour in self.neighbours(tile) if neighbour in closed]
+                if len(options) > 0: #none when the only expanded neighbour is a blocked start (the agent inside an enemy), keep the parent then
+                    g[tile], parents[tile] = min(options)
+            if tile == goal:
+                path = [tile]
+                while parents[tile] != tile:
+                    tile = parents[tile]
+                    path.append(tile)
+                return path[::-1]
+            closed.add(tile)
+            self.expanded_nodes += 1
+            parent = parents[tile]
+            for neighbour in self.neighbours(tile):
+                if neighbour in closed:
+                    continue
+                cost = g[parent] + self.cost(parent, neighbour) #assume the parent can see the neighbour, checked once the neighbour is expanded
+                if cost < g.get(neighbour, math.inf):
+                    g[neighbour] = cost
+                    parents[neighbour] = parent
+                    heapq.heappush(frontier, (cost + self.cost(neighbour, goal), next(counter), neighbour))
+        return None
@@ -0,0 +1,56 @@
+import queue
+import threading
+from skills.tracing import trace
+
+class PlanningThread(threading.Thread):
+    '''
+    Plans path segments off the frame loop, laid out like GUI-Vizdoom's ThreadedProcessingExample.
+    Requests come in through a queue as (request id, snapshot, start, destination), the snapshot being a copy of the navigator's world state
+    that only this thread reads, and each finished plan is left in a single slot until the navigator collects it (or a newer request replaces it).
+    '''
+
+    def __init__(self):
+        threading.Thread.__init__(self, daemon = True)
+        self.requests = queue.Queue()
+        self.lock = threading.Lock() #guards finished and outstanding
+        self.finished = None #(request id, (path_tiles, path_actions), snapshot) of the latest plan done
+        self.outstanding = 0 #requests submitted but not planned yet
+        self.is_done = False
+
+    def submit(self, request_id, snapshot, start, destination):
+        with self.lock:
+            self.outstanding += 1
+        self.requests.put((request_id, snapshot, start, destination))
+
+    #is a plan being worked on, a new snapshot mustn't be written while one is
+    def busy(self):
+        with self.lock:
+            return self.outstanding > 0
+
+    #the (plan, snapshot) of a request once it's done, None while it's still being planned
+    def result(self, request_id):
+        with self.lock:
+            if self.finished == None or self.finished[0] != request_id:
+                return None
+            ret = self.finished[1:]
+            self.finished = None
+            return ret
+
+    def run(self):
+        while not self.is_done:
+            request = self.requests.get()
+            if request == None: #stop was called
+                break
+            request_id, snapshot, start, destination = request
+            try:
+                plan = snapshot.pathfind(start, destination)
+            except Exception as error: #the frame loop can't see this thread's exceptions, so report and give up on the plan
+                trace.planner.error("background planning failed: %r", error)
+                plan = (None, None)
+            with self.lock:
+                self.finished = (request_id, plan, snapshot)
+                self.outstanding -= 1
+
+    def stop(self):
+        self.is_done = True
+        self.requests.put(None)
@@ -0,0 +1,72 @@
+'''
+Plans many (start, destination) pairs at once over a ProcessPoolExecutor, for scoring candidate destinations and reachability sweeps offline.
+The processed map is serialized once (the same format as the map cache) and handed to each worker through the pool's initializer,
+so every worker rebuilds its Navigator a single time and the queries themselves only carry coordinates.
+Results come back in the order the queries were given:
+    with BatchPlanner(navigator, workers = 4) as planner:
+        moves = planner.costs([((64, 64), (448, 128)), ((64, 64), (900, 40))]) #None where the destination can't be reached
+        paths = planner.paths(queries) #world coordinates of the tiles along each journey
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from skills.Navigation import Navigator
+from skills.map_cache import serialize_map, deserialize_map
+from skills.geometry import *
+
+worker_navigator = None #each worker process's own Navigator, set up by init_worker
+
+#runs once in every worker process, rebuilds the navigator from the serialized map
+def init_worker(backend_name, data, obstacles, options):
+    global worker_navigator
+    navigator = Navigator(geometry_backend = backend_name, map_cache = False, **options)
+    deserialize_map(navigator, data)
+    navigator.walls_raw = [] #already processed, stops update_features from asking for the walls again
+    navigator.obstacles = list(obstacles)
+    navigator.obstacle_store.refresh(navigator.obstacles)
+    navigator.angle = 0
+    navigator.index_map()
+    worker_navigator = navigator
+
+def point(coords):
+    return coord_tuple(backend.number(coords[0]), backend.number(coords[1]))
+
+#plan one query in a worker, the journey's tile centers or None
+def plan_path(query):
+    start, destination = query
+    return worker_navigator.plan_journey(point(start), point(destination))
+
+#plan one query in a worker, the number of moves or None
+def plan_cost(query):
+    path = plan_path(query)
+    return None if path == None else len(path) - 1
+
+class BatchPlanner:
+    '''
+    A pool of worker processes that each hold a copy of one navigator's processed map and plan whole journeys with Navigator.plan_journey.
+    The navigator's planning options (incremental, jump_points, hierarchical, any_angle) and obstacles carry over, enemies don't.
+    '''
+
+    def __init__(self, navigator, workers = None, chunksize = 16):
+        options = {"incremental": navigator.incremental, "jump_points": navigator.jump_points, "hierarchical": navigator.hierarchical,
+            "any_angle": navigator.any_angle, "path_cache_size": navigator.path_cache.capacity}
+        self.chunksize = chunksize #queries sent to a worker at a time
+        self.workers = workers if workers != None else os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+            initargs = (backend.name, serialize_map(navigator), navigator.obstacles, options))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    #for each (start, destination) pair, the world coordinates of the tile centers from start to destination, None if it can't be reached
+    def paths(self, queries):
+        return list(self.pool.map(plan_path, queries, chunksize = self.chunksize))
+
+    #for each (start, destination) pair, how many moves the journey takes, None if it can't be reached
+    def costs(self, queries):
+        return list(self.pool.map(plan_cost, queries, chunksize = self.chunksize))
+
+    def close(self):
+        self.pool.shutdown()
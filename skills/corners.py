@@ -0,0 +1,130 @@
+from collections.abc import Mapping
+
+class CornerTable:
+    '''
+    One numbering of a finished map's corners and lines: vertex id -> coordinates, segment id -> line, and for every vertex the ids of the segments meeting there.
+    NavMap builds it once and compacts every line's corner dicts into CornerLists over it, each corner's coordinates are then stored once per map
+    instead of once per line that touches it, and the lines at a corner are a small tuple of ids instead of a set.
+    '''
+
+    def __init__(self, lines):
+        self.points = [] #vertex id -> coord_tuple
+        self.vertex_ids = {} #coord_tuple -> vertex id
+        self.lines = list(lines) #segment id -> line
+        self.segment_ids = {line: i for i, line in enumerate(self.lines)}
+        incident = []
+        for i, line in enumerate(self.lines):
+            for dicti in (line.corners, getattr(line, "doorway_corners", {})):
+                for corner, others in dicti.items():
+                    vertex = self.vertex(corner)
+                    while len(incident) <= vertex:
+                        incident.append(set())
+                    incident[vertex].add(i)
+                    incident[vertex].update(self.segment_ids[other] for other in others)
+        self.incident = [tuple(sorted(segments)) for segments in incident] #vertex id -> ids of the segments meeting there
+
+    #the id of a corner, numbering it if it's new
+    def vertex(self, corner):
+        vertex = self.vertex_ids.get(corner)
+        if vertex == None:
+            vertex = len(self.points)
+            self.vertex_ids[corner] = vertex
+            self.points.append(corner)
+        return vertex
+
+    #a read only CornerList holding the same corners as dicti (corner -> lines meeting it), ordered along line like next_corner searches them
+    def compact(self, line, dicti):
+        if line.s == True: #vertical line
+            corners = sorted(dicti.keys(), key = lambda c: c.y)
+        else:
+            corners = sorted(dicti.keys(), key = lambda c: c.x)
+        vertices = tuple(self.vertex(c) for c in corners)
+        segments = tuple(tuple(self.segment_ids[other] for other in dicti[c]) for c in corners)
+        return CornerList(self, tuple(self.points[v] for v in vertices), vertices, segments)
+
+    #swap the corner dicts of every line in the table for CornerLists, nothing can add corners to them afterwards
+    def compact_lines(self):
+        for line in self.lines:
+            line.corners = self.compact(line, line.corners)
+            if hasattr(line, "doorway_corners"):
+                line.doorway_corners = self.compact(line, line.doorway_corners)
+
+class CornerList(Mapping):
+    '''
+    The corners of one line as vertex ids into a CornerTable, read like the dict it replaces: coord_tuple -> the lines meeting this one there.
+    '''
+
+    __slots__ = ("table", "points", "vertices", "segments")
+
+    def __init__(self, table, points, vertices, segments):
+        self.table = table
+        self.points = points #the corners' coordinates, ordered along the line
+        self.vertices = vertices #their vertex ids
+        self.segments = segments #for each corner, the segment ids of the other lines there
+
+    def get(self, corner, default = None):
+        vertex = self.table.vertex_ids.get(corner)
+        if vertex == None or vertex not in self.vertices:
+            return default
+        lines = self.table.lines
+        return tuple(lines[segment] for segment in self.segments[self.vertices.index(vertex)])
+
+    def __getitem__(self, corner):
+        ret = self.get(corner)
+        if ret == None:
+            raise KeyError(corner)
+        return ret
+
+    def __contains__(self, corner):
+        return self.table.vertex_ids.get(corner) in self.vertices
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self):
+        return len(self.vertices)
+
+class CornerView(Mapping):
+    '''
+    A wall's corners and doorway corners read as one mapping (what next_corner_doorways searches), without keeping a third copy of either.
+    '''
+
+    __slots__ = ("wall",)
+
+    def __init__(self, wall):
+        self.wall = wall
+
+    def get(self, corner, default = None):
+        walls = self.wall.corners.get(corner)
+        doorways = self.wall.doorway_corners.get(corner)
+        if doorways == None:
+            return walls if walls != None else default
+        if walls == None:
+            return doorways
+        return set(walls).union(doorways)
+
+    def __getitem__(self, corner):
+        ret = self.get(corner)
+        if ret == None:
+            raise KeyError(corner)
+        return ret
+
+    def __contains__(self, corner):
+        return corner in self.wall.corners or corner in self.wall.doorway_corners
+
+    def __iter__(self):
+        yield from self.wall.corners
+        for corner in self.wall.doorway_corners:
+            if corner not in self.wall.corners:
+                yield corner
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+#the coordinates in corners (a dict, CornerList or CornerView) sorted along line, the order next_corner searches them in
+def ordered_corners(line, corners):
+    if type(corners) == CornerView and len(corners.wall.doorway_corners) == 0: #type() rather than isinstance, abc checks are slow and this runs every step
+        corners = corners.wall.corners
+    if type(corners) == CornerList:
+        return corners.points
+    return sorted(corners.keys(), key = (lambda c: c.y) if line.s == True else (lambda c: c.x))
@@ -1,4 +1,5 @@
 from skills.geometry import *
+from skills.corners import CornerView
 
 class LocalEnum:
     #check_intersection parameters
@@ -21,25 +22,16 @@ class LocalEnum:
 enum = LocalEnum()
 
 class Wall(Line):
+    __slots__ = ("doorway_corners",)
+
     def __init__(self, a = None, b = None):
         super().__init__(a, b)
         self.doorway_corners = {} #this may not even be needed honestly
-        self.all_corners = {}
-
-    def prepare_all_corners(self):
-        if self.all_corners == None:
-            keys = set(self.doorway_corners.keys())
-
-            def concatenate(dicti: dict, key):
-                lis = self.doorway_corners[key] #this is a set
-                if dicti.get(key) != None:
-                    map(lambda x: dicti[key].add(x), lis) #for every item in the set, add it to the existing set
-                else:
-                    dicti[key] = lis
-                return dicti
 
-            #first we need to concatenate the two lists
-            self.all_corners = reduce(concatenate, keys, self.corners.copy())
+    #corners and doorway corners together, read through rather than kept as a third copy
+    @property
+    def all_corners(self):
+        return CornerView(self)
 
     def next_corner_doorways(self, direction, side, rotation, coords): #find the next corner while factoring in the doorways
         #print("DEBUGGING, NEXT_CORNER &&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&&")
@@ -51,22 +43,13 @@ class Wall(Line):
             self.doorway_corners[intersection] = {line}
         else:
             self.doorway_corners[intersection].add(line)
-        if self.all_corners.get(intersection) == None:
-            self.all_corners[intersection] = {line}
-        else:
-            self.all_corners[intersection].add(line)
-
-    def add_intersection(self, intersection, line): #this will also factor in all_corners
-        super().add_intersection(intersection, line)
-        if self.all_corners.get(intersection) == None:
-            self.all_corners[intersection] = {line}
-        else:
-            self.all_corners[intersection].add(line)
 
     def to_string(self):
         return f"{self.coords[0]} to {self.coords[1]}"
 
 class Doorway(Wall):
+    __slots__ = ("room_l", "room_r")
+
     def __init__(self, a = None, b = None):
         super().__init__(a, b)
         self.room_l = None
@@ -81,12 +64,14 @@ class Doorway(Wall):
             return None
 
 class Room():
+    __slots__ = ("doorways", "corners", "walls")
+
     def __init__(self, doorways = None):
         if doorways != None:
             self.doorways = doorways #a room stores a list of doorways that it contains
         else:
             self.doorways = set()
-        self.corners = set()
+        self.corners = [] #the corners around the room in the order discover_room walked them, the room's polygon
         self.walls = set()
         #self.generate_name()
 
@@ -112,7 +97,7 @@ class Room():
 
 #may request a function for updating in the future
 def check_intersection(line: Line, line1: Line, update: int = 0):
-    if line.m == line1.m: #the lines are parallel
+    if backend.near(line.m, line1.m): #the lines are parallel
         if line.s == enum.vertical: #lines are vertical
             if line.coords[0].x != line1.coords[0].x: #the vertical lines don't intersect, don't line up
                 rcode, rcoords = enum.no_intersection_parallel, None
@@ -128,7 +113,7 @@ def check_intersection(line: Line, line1: Line, update: int = 0):
             else:
                 rcode, rcoords = enum.no_intersection_parallel, None #vertical parallel lines don't touch
         else: #lines aren't vertical, can be diagonal or horizontal
-            if line.b != line1.b: #don't line up but still parallel
+            if not backend.near(line.b, line1.b): #don't line up but still parallel
                 rcode, rcoords = enum.no_intersection_parallel, None
             elif (max(line.coords[0].x, line.coords[1].x) == min(line1.coords[0].x, line1.coords[1].x) or 
                     max(line1.coords[0].x, line1.coords[1].x) == min(line.coords[0].x, line.coords[1].x)): #lines share an endpoint
@@ -141,6 +126,8 @@ def check_intersection(line: Line, line1: Line, update: int = 0):
                 rcode, rcoords = enum.overlap_parallel, None #lines overlap each other (in a different way)
             else:
                 rcode, rcoords = enum.no_intersection_parallel, None #lines don't touch
+    elif shared_endpoint(line, line1) != None: #two lines that aren't parallel and share an endpoint meet exactly there, solving for it would round off diagonals
+        rcode, rcoords = enum.intersection, shared_endpoint(line, line1)
     elif line.s == enum.vertical or line1.s == enum.vertical: #one of the two lines is vertical
         if line.s == enum.vertical: #if line is vertical
             vert = line
@@ -149,16 +136,18 @@ def check_intersection(line: Line, line1: Line, update: int = 0):
             vert = line1
             nvert = line
         intersection = coord_tuple(vert.coords[0].x, nvert.equation(x = vert.coords[0].x))
-        if (min(nvert.coords[0].x, nvert.coords[1].x) <= intersection.x <= max(nvert.coords[1].x, nvert.coords[0].x) and 
-                min(vert.coords[0].y, vert.coords[1].y) <= intersection.y <= max(vert.coords[1].y, vert.coords[0].y)):
-            rcode, rcoords = enum.intersection, intersection #the intersection is within the bounds of both segments
+        if (backend.within(intersection.x, min(nvert.coords[0].x, nvert.coords[1].x), max(nvert.coords[1].x, nvert.coords[0].x)) and 
+                backend.within(intersection.y, min(vert.coords[0].y, vert.coords[1].y), max(vert.coords[1].y, vert.coords[0].y))):
+            rcode, rcoords = enum.intersection, snap_intersection(intersection, vert, nvert) #the intersection is within the bounds of both segments
         else:
             rcode, rcoords = enum.no_intersection, intersection #intersection lies outside the bounds of both segments
     else: #neither of the two lines are vertical
         intersection = coord_tuple((line.b - line1.b) / (line1.m - line.m), (line1.b * line.m - line.b * line1.m) / (line.m - line1.m))
-        if (min(line.coords[0].x, line.coords[1].x) <= intersection.x <= max(line.coords[0].x, line.coords[1].x) and
-                min(line.coords[0].y, line.coords[1].y) <= intersection.y <= max(line.coords[0].y, line.coords[1].y)):
-            rcode, rcoords = enum.intersection, intersection #the intersection is within the bounds of both segments
+        if (backend.within(intersection.x, min(line.coords[0].x, line.coords[1].x), max(line.coords[0].x, line.coords[1].x)) and
+                backend.within(intersection.y, min(line.coords[0].y, line.coords[1].y), max(line.coords[0].y, line.coords[1].y)) and
+                backend.within(intersection.x, min(line1.coords[0].x, line1.coords[1].x), max(line1.coords[0].x, line1.coords[1].x)) and
+                backend.within(intersection.y, min(line1.coords[0].y, line1.coords[1].y), max(line1.coords[0].y, line1.coords[1].y))):
+            rcode, rcoords = enum.intersection, snap_intersection(intersection, line, line1) #the intersection is within the bounds of both segments
         else:
             rcode, rcoords = enum.no_intersection, intersection
 
@@ -181,3 +170,30 @@ def check_intersection(line: Line, line1: Line, update: int = 0):
         elif type(line1) == Doorway:
             line.add_doorway_intersection(rcoords, line1)
     return rcode, rcoords
+
+#broad phase for check_intersection, sweeps across x and only pairs up lines whose bounding boxes touch
+#pairs come back in the same order itertools.combinations(lines, 2) would give them, so updating corners with them is identical to checking every pair
+def candidate_pairs(lines):
+    lines = list(lines)
+    boxes = []
+    for line in lines:
+        xs = (float(line.coords[0].x), float(line.coords[1].x))
+        ys = (float(line.coords[0].y), float(line.coords[1].y))
+        boxes.append((min(xs), max(xs), min(ys), max(ys)))
+    if len(boxes) == 0:
+        return []
+    #padding covers float rounding of the boxes and anything check_intersection would still accept under the backend's epsilon
+    largest = max(max(abs(box[0]), abs(box[1]), abs(box[2]), abs(box[3])) for box in boxes)
+    padding = 1e-6 + float(backend.epsilon) * (1 + largest)
+
+    pairs = []
+    active = [] #lines whose x range could still reach the lines we haven't swept yet
+    for i in sorted(range(len(lines)), key = lambda i: boxes[i][0]):
+        min_x, _, min_y, max_y = boxes[i]
+        active = [j for j in active if boxes[j][1] + padding >= min_x]
+        for j in active:
+            if boxes[j][2] <= max_y + padding and min_y <= boxes[j][3] + padding: #the y ranges overlap too
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    pairs.sort()
+    return [(lines[i], lines[j]) for i, j in pairs]
@@ -0,0 +1,42 @@
+import numpy as np
+
+ENTITY_DTYPE = np.dtype([("x", np.float64), ("y", np.float64), ("radius", np.float64)])
+
+class EntityStore:
+    '''
+    Enemies or obstacles as a NumPy structured array (x, y, radius), refreshed from the feature vector's list of dicts in one pass,
+    so checking a whole batch of points against every entity is a single broadcast instead of a distance call per entity per point.
+    '''
+
+    def __init__(self, radius = 0):
+        self.radius = radius #how close a point can get to an entity, unless refresh is given another one
+        self.array = np.empty(0, dtype = ENTITY_DTYPE)
+
+    def __len__(self):
+        return len(self.array)
+
+    #replace the entities with the ones in a feature vector list (dicts with x_position and y_position)
+    def refresh(self, entities, radius = None):
+        radius = self.radius if radius == None else radius
+        self.array = np.fromiter(((entity["x_position"], entity["y_position"], radius) for entity in entities),
+            dtype = ENTITY_DTYPE, count = len(entities))
+
+    #a store that refresh calls on this one won't affect
+    def copy(self):
+        ret = EntityStore(self.radius)
+        ret.array = self.array.copy()
+        return ret
+
+    #(n, 2) float array of the entities' positions
+    def positions(self):
+        return np.column_stack((self.array["x"], self.array["y"]))
+
+    #for each of the (m, 2) points, is any entity closer than its radius (or the radius given)
+    def within(self, points, radius = None):
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 2)
+        if len(self.array) == 0:
+            return np.zeros(len(points), dtype = bool)
+        dx = points[:, 0, None] - self.array["x"][None, :]
+        dy = points[:, 1, None] - self.array["y"][None, :]
+        reach = self.array["radius"] if radius == None else radius
+        return (dx * dx + dy * dy < reach * reach).any(axis = 1)
@@ -1,19 +1,78 @@
 from collections import namedtuple
-from decimal import Decimal
+from decimal import Decimal, ROUND_FLOOR
 from functools import reduce
 import math
+import numpy as np
+from skills.corners import ordered_corners
 
 coord_tuple = namedtuple("Coords", ["x", "y"])
 
+class GeometryBackend:
+    '''
+    The number type used by every line and coordinate. "decimal" is exact but slow, "float" uses float64 (with NumPy segment arrays) and
+    compares slopes, intercepts and intersections within a relative epsilon instead of exactly. Pick the backend before any lines are created,
+    lines made under one backend can't be mixed with lines made under the other.
+    '''
+
+    def __init__(self, name = "decimal"):
+        self.set(name)
+
+    def set(self, name):
+        if name == "decimal":
+            self.type = Decimal
+            self.epsilon = Decimal(0) #exact comparisons, this is how the geometry has always behaved
+        elif name == "float":
+            self.type = float
+            self.epsilon = 1e-7 #relative tolerance, scaled by the magnitude of the values being compared
+        else:
+            raise ValueError(f"unknown geometry backend {name}, expected 'decimal' or 'float'")
+        self.name = name
+        self.half = self.type("0.5")
+
+    def number(self, value):
+        return value if isinstance(value, self.type) else self.type(value)
+
+    #equality under the epsilon policy, slopes can also be the "VERTICAL" string so anything that isn't a number is compared exactly
+    def near(self, a, b):
+        if a == b:
+            return True
+        if self.epsilon == 0 or isinstance(a, str) or isinstance(b, str):
+            return False
+        return abs(a - b) <= self.epsilon * max(1, abs(a), abs(b))
+
+    #is value within [low, high] under the epsilon policy
+    def within(self, value, low, high):
+        if low <= value <= high or self.epsilon == 0:
+            return low <= value <= high
+        tolerance = self.epsilon * max(1, abs(value))
+        return low - tolerance <= value <= high + tolerance
+
+    #a / b rounded down to a whole number, for Decimal this has to be spelled out since Decimal's // rounds towards zero
+    def floor_div(self, a, b):
+        if self.type == Decimal:
+            return (a / b).to_integral_value(rounding = ROUND_FLOOR)
+        return a // b
+
+    #remainder of floor_div, always has the sign of b
+    def floor_mod(self, a, b):
+        return a - b * self.floor_div(a, b)
+
+backend = GeometryBackend()
+
+#switch every line and coordinate created from now on to the given backend ("decimal" or "float")
+def set_backend(name):
+    backend.set(name)
+
 class Line:
+    __slots__ = ("coords", "m", "b", "s", "corners", "_segment") #maps hold thousands of lines, no per-line __dict__
+
     def __init__(self, a = None, b = None):
         if a == None and b == None:
-            self._coords = None
+            self.coords = None
         if a != None and b == None:
             b = a[1]
             a = a[0]
-        self.coords = (coord_tuple(Decimal(a[0]), Decimal(a[1])), coord_tuple(Decimal(b[0]), Decimal(b[1])))
-        self.m, self.b, self.s = generate_equation(self._coords)
+        self.set_coords(a, b)
         self.corners = {} #dictionary of points and the lines that intersect at that point
 
         '''
@@ -31,31 +90,26 @@ class Line:
     '''
 
     @property
-    def coords(self) -> tuple[coord_tuple, coord_tuple]:
-        return self._coords
-
-    @coords.setter
-    def coords(self, c):
-        if len(c) == 2:
-            if (isinstance(c[0], tuple) or isinstance(c[0], coord_tuple)) and (isinstance(c[1], tuple) or isinstance(c[1], coord_tuple)):
-                x1 = c[0][0] if isinstance(c[0][0], Decimal) else Decimal(c[0][0])
-                y1 = c[0][1] if isinstance(c[0][1], Decimal) else Decimal(c[0][1])
-                x2 = c[1][0] if isinstance(c[1][0], Decimal) else Decimal(c[1][0])
-                y2 = c[1][1] if isinstance(c[1][1], Decimal) else Decimal(c[1][1])
-                self._coords = (coord_tuple(x1, y1), coord_tuple(x2, y2))
-                self.m, self.b, self.s = generate_equation(self._coords)
+    def length(self):
+        return ((self.coords[0].x - self.coords[1].x)**2 + (self.coords[0].y - self.coords[1].y)**2)**backend.half
 
+    #the segment as a float64 array [x1, y1, x2, y2], stack these with segments_array for vectorized queries
     @property
-    def length(self):
-        return ((self._coords[0].x - self._coords[1].x)**2 + (self._coords[0].y - self._coords[1].y)**2)**Decimal("0.5")
+    def segment(self):
+        if self._segment is None:
+            self._segment = np.array([self.coords[0].x, self.coords[0].y, self.coords[1].x, self.coords[1].y], dtype = np.float64)
+        return self._segment
     
+    #coords is a plain attribute (check_intersection and next_corner read it constantly), set it through here so the equation follows
     def set_coords(self, a, b):
-        self.coords = (a, b)
+        self.coords = (coord_tuple(backend.number(a[0]), backend.number(a[1])), coord_tuple(backend.number(b[0]), backend.number(b[1])))
+        self.m, self.b, self.s = generate_equation(self.coords)
+        self._segment = None
 
     def equation(self, x = None, y = None):
         if x != None and y == None:
             if not isinstance(self.s, bool) or not self.s: #if self is not vertical
-                return self.m * Decimal(x) + self.b
+                return self.m * backend.number(x) + self.b
             else: #self is vertical
                 return None
         elif y != None and x == None:
@@ -65,9 +119,9 @@ class Line:
                 return None
         elif y != None and x != None: #essentially works as a check on whether the point (x,y) is on this segment
             returned_y = self.equation(x) #a single recursive call, to check if the y matches with the result of passing x through
-            if returned_y == None or round(Decimal(returned_y), 3) == round(Decimal(y), 3): #the point is on the line but not necessarily within the bounds of the segment
-                if (round(min(self.coords[0].x, self.coords[1].x), 3) <= round(Decimal(x), 3) <= round(max(self.coords[0].x, self.coords[1].x), 3) and 
-                        round(min(self.coords[0].y, self.coords[1].y), 3) <= round(Decimal(y), 3) <= round(max(self.coords[0].y, self.coords[1].y), 3)):
+            if returned_y == None or round(backend.number(returned_y), 3) == round(backend.number(y), 3): #the point is on the line but not necessarily within the bounds of the segment
+                if (round(min(self.coords[0].x, self.coords[1].x), 3) <= round(backend.number(x), 3) <= round(max(self.coords[0].x, self.coords[1].x), 3) and 
+                        round(min(self.coords[0].y, self.coords[1].y), 3) <= round(backend.number(y), 3) <= round(max(self.coords[0].y, self.coords[1].y), 3)):
                     return True
             return False
         else: #return a spring representation of the equation
@@ -92,22 +146,17 @@ class Line:
 
         #search for the next corner, whether or not we're on a corner already, if search_next is True
         if this_corner == False:
-            corn_coords = list(corners.keys()) #get all the coordinates for the corners
+            corn_coords = ordered_corners(self, corners) #get all the coordinates for the corners, sorted along the line
             if self.s == True: #vertical line
-                corn_coords.sort(key = lambda c: c.y)
                 if direction == 1: #if we're searching upwards
-                    corn_coords.sort(key = lambda c: c.y)
                     corn_coord = next(c for c in corn_coords if c.y > coords.y)
                 else: #we're searching downwards
-                    corn_coords.sort(key = lambda c: c.y, reverse = True)
-                    corn_coord = next(c for c in corn_coords if c.y < coords.y)
+                    corn_coord = next(c for c in reversed(corn_coords) if c.y < coords.y)
             else: #not vertical line
                 if direction == 1: #if we're searching towards the right
-                    corn_coords.sort(key = lambda c: c.x)
                     corn_coord = next(c for c in corn_coords if c.x > coords.x) #find the first corner with a larger x value than our specified coordinates
                 else: #we're searching towards the left
-                    corn_coords.sort(key = lambda c: c.x, reverse = True)
-                    corn_coord = next(c for c in corn_coords if c.x < coords.x) #find the first corner with a smaller x value than our specified coordinates
+                    corn_coord = next(c for c in reversed(corn_coords) if c.x < coords.x) #find the first corner with a smaller x value than our specified coordinates
         else:
             corn_coord = coords
         lines = corners[corn_coord] #retrieve the lines this corner contains
@@ -148,20 +197,11 @@ class Line:
                         s.append(((cur_angle + 90) % 360, x))
                     if corn_coord.y < max(x.coords[0].y, x.coords[1].y): #we are not on the top endpoint of x
                         s.append(((cur_angle + 270) % 360, x))
-                else: #comparing a nonvertical with a nonvertical
-                    if round(x.m * self.m, 3) == -1: #the two lines are perpendicular
-                        if corn_coord.x > min(x.coords[0].x, x.coords[1].x): #we are not on the left endpoint of x
-                            s.append((90, x)) #generate the left angle
-                        if corn_coord.x < max(x.coords[0].x, x.coords[1].x): #we are not on the right endpoint of x
-                            s.append((270, x)) #generate the right angle
-                    else: #comparing two nonvertical, nonperpendicular lines
-                        if self.s == False and x.s == False: #comparing two horizontal lines
-                            s.append((180, x))
-                        else:
-                            if corn_coord.x > min(x.coords[0].x, x.coords[1].x): #we are not on the left endpoint of x
-                                s.append(((math.degrees(math.atan((self.m - x.m) / (1 + self.m * x.m))) + 180) % 360, x))
-                            if corn_coord.x < max(x.coords[0].x, x.coords[1].x): #we are not on the right endpoint of x
-                                s.append(((math.degrees(math.atan((self.m - x.m) / (1 + self.m * x.m))) + 360) % 360, x))
+                else: #comparing a nonvertical with a nonvertical, same as the vertical case above: the angle from where we came from to where x leaves
+                    if corn_coord.x > min(x.coords[0].x, x.coords[1].x): #we are not on the left endpoint of x
+                        s.append(((cur_angle - math.degrees(math.atan(x.m)) + 180) % 360, x)) #generate the left angle
+                    if corn_coord.x < max(x.coords[0].x, x.coords[1].x): #we are not on the right endpoint of x
+                        s.append(((cur_angle - math.degrees(math.atan(x.m)) + 360) % 360, x)) #generate the right angle
                 return s
 
         lines = reduce(find_angles, lines, [])
@@ -279,5 +319,59 @@ def project(point: coord_tuple, line: Line) -> coord_tuple:
 def distance(point: coord_tuple, point1: coord_tuple) -> float:
     return ((float(point.x) - float(point1.x)) ** 2 + (float(point.y) - float(point1.y)) ** 2) ** 0.5
 
+#stacks the float64 segments of the given lines into an (n, 4) array of [x1, y1, x2, y2] rows
+def segments_array(lines) -> np.ndarray:
+    lines = list(lines)
+    if len(lines) == 0:
+        return np.empty((0, 4), dtype = np.float64)
+    return np.stack([line.segment for line in lines])
+
+#vectorized distance_to_line, distances from a point to every segment of an (n, 4) array in one pass
+def distances_to_segments(point, segments: np.ndarray) -> np.ndarray:
+    start = segments[:, 0:2]
+    delta = segments[:, 2:4] - start
+    offset = np.array([float(point[0]), float(point[1])]) - start
+    length_squared = np.einsum("ij,ij->i", delta, delta)
+    t = np.clip(np.einsum("ij,ij->i", offset, delta) / np.where(length_squared == 0, 1, length_squared), 0, 1) #how far along each segment the closest point is
+    closest = start + delta * t[:, None]
+    return np.hypot(float(point[0]) - closest[:, 0], float(point[1]) - closest[:, 1])
+
+#distance from every point to every segment, (p, 2) points and (n, 4) segments give a (p, n) array
+def points_to_segments(points: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    start = segments[None, :, 0:2]
+    delta = segments[None, :, 2:4] - start
+    offset = points[:, None, :] - start
+    length_squared = (delta * delta).sum(axis = 2)
+    t = np.clip((offset * delta).sum(axis = 2) / np.where(length_squared == 0, 1, length_squared), 0, 1)
+    closest = start + delta * t[:, :, None]
+    return np.hypot(points[:, None, 0] - closest[:, :, 0], points[:, None, 1] - closest[:, :, 1])
+
+#distance between every query segment and every segment, (q, 4) and (n, 4) arrays give a (q, n) array that is 0 wherever two of them cross
+def segment_distances(queries: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    def cross(origin, a, b): #z of (a - origin) x (b - origin), broadcast to (q, n)
+        return (a[..., 0] - origin[..., 0]) * (b[..., 1] - origin[..., 1]) - (a[..., 1] - origin[..., 1]) * (b[..., 0] - origin[..., 0])
+    q1, q2 = queries[:, None, 0:2], queries[:, None, 2:4]
+    s1, s2 = segments[None, :, 0:2], segments[None, :, 2:4]
+    crossing = ((cross(q1, q2, s1) * cross(q1, q2, s2) < 0) & (cross(s1, s2, q1) * cross(s1, s2, q2) < 0))
+    ends = np.minimum(points_to_segments(segments[:, 0:2], queries), points_to_segments(segments[:, 2:4], queries)).T #segment ends to the queries
+    ends = np.minimum(ends, np.minimum(points_to_segments(queries[:, 0:2], segments), points_to_segments(queries[:, 2:4], segments))) #query ends to the segments
+    return np.where(crossing, 0, ends)
+
+#the endpoint two lines have in common, None if they don't share one
+def shared_endpoint(line: Line, line1: Line):
+    for endpoint in line.coords:
+        if endpoint == line1.coords[0] or endpoint == line1.coords[1]:
+            return endpoint
+    return None
+
+#snap an intersection onto an endpoint of either line if it's within the backend's epsilon, so corners computed by different formulas share a key
+def snap_intersection(point: coord_tuple, line: Line, line1: Line) -> coord_tuple:
+    if backend.epsilon == 0:
+        return point
+    for endpoint in line.coords + line1.coords:
+        if backend.near(point.x, endpoint.x) and backend.near(point.y, endpoint.y):
+            return endpoint
+    return point
+
 if __name__ == "__main__":
     print("hi there buddy, import this module don't run it :)")
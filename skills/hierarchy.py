@@ -0,0 +1,120 @@
+from skills.doorways import *
+from skills.occupancy import OccupancyGrid
+from skills.jumppoint import JumpPointSearch
+
+MAX_LAYOUTS = 8 #tile layouts whose grids and paths are kept
+
+class RoomPaths:
+    '''
+    Tile paths inside single rooms, the local half of hierarchical (HPA* style) planning.
+    Every room gets its own small OccupancyGrid covering its bounding box, with the lines around it and the obstacles in it stamped,
+    so a search that stays inside one room never builds or walks the grid of the whole map.
+    Paths are searched the first time they're asked for and kept, keyed by the room, which of its doorways are open and the two end tiles.
+    Weighing the doorway graph's edges with these turns it into the abstract graph: a route across the map is a search over doorways
+    plus short local searches, and repeating a journey reuses the local paths already found.
+    Tiles are (x, y) integer tuples in the same tile coordinates as Navigator.to_tile.
+    '''
+
+    def __init__(self, line_index, player_radius):
+        self.line_index = line_index #spatial hash over the walls and doorways, finds the lines near a room
+        self.player_radius = player_radius
+        self.obstacles = None #EntityStore of the obstacles, stamped into every room's grid
+        self.layout = None #(tile bias x, tile bias y, tile size, obstacle count) of the grids and paths below
+        self.layouts = {} #layout -> (grids, closed, paths) built for it, the most recently used last
+        self.grids = {} #room -> (grid with every doorway open, {doorway: cells it blocks})
+        self.closed = {} #(room, open doorways) -> grid with the other doorways blocked
+        self.paths = {} #(room, open doorways, start tile, goal tile) -> list of tiles, None if the goal can't be reached
+        self.expanded_nodes = 0 #jump points expanded by the last search that wasn't cached
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    #switch to the grids and paths of a tile layout, each agent position lines the tiles up differently so a few layouts are kept
+    def set_layout(self, tile_bias, tile_size, obstacles):
+        layout = (round(float(tile_bias.x), 3), round(float(tile_bias.y), 3), float(tile_size), len(obstacles)) #positions drift by rounding errors between segments
+        self.obstacles = obstacles
+        caches = self.layouts.pop(layout, None)
+        if caches == None:
+            caches = ({}, {}, {})
+            if len(self.layouts) >= MAX_LAYOUTS:
+                del self.layouts[next(iter(self.layouts))]
+        self.layouts[layout] = caches
+        self.layout = layout
+        self.tile_bias, self.tile_size = tile_bias, tile_size
+        self.grids, self.closed, self.paths = caches
+
+    #world bounding box of a room's walls and doorways
+    def bounds(self, room):
+        lines = list(room.walls) + list(room.doorways)
+        xs = [float(line.coords[i].x) for line in lines for i in range(2)]
+        ys = [float(line.coords[i].y) for line in lines for i in range(2)]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    #the room's grid with every doorway open, plus the cells each doorway near it blocks
+    def room_grid(self, room):
+        ret = self.grids.get(room)
+        if ret == None:
+            tile_bias, tile_size = self.tile_bias, self.tile_size
+            min_x, min_y, max_x, max_y = self.bounds(room)
+            occupancy = OccupancyGrid(tile_bias, tile_size, (min_x, min_y, max_x, max_y), margin = 2 * float(tile_size))
+            center = ((min_x + max_x) / 2, (min_y + max_y) / 2)
+            reach = max(max_x - min_x, max_y - min_y) / 2 + 2 * float(tile_size) + self.player_radius
+            lines = self.line_index.query(center, reach) #everything that could reach into the window, the neighbours' walls included
+            walls = segments_array([line for line in lines if type(line) != Doorway])
+            occupancy.stamp_segments(walls, self.player_radius)
+            occupancy.stamp_supercover(walls) #same as the whole map's static occupancy
+            positions = self.obstacles.positions()
+            if len(positions) > 0:
+                inside = ((positions[:, 0] >= min_x - reach) & (positions[:, 0] <= max_x + reach) &
+                    (positions[:, 1] >= min_y - reach) & (positions[:, 1] <= max_y + reach))
+                occupancy.stamp_points(positions[inside], self.player_radius)
+            doorway_cells = {line: occupancy.segment_cells(line.segment, self.player_radius) for line in lines if type(line) == Doorway}
+            ret = self.grids[room] = (occupancy, doorway_cells)
+        return ret
+
+    #the room's grid with only the given doorways open, the rest of the map is out of reach from inside it
+    def grid(self, room, open_doorways):
+        key = (room, open_doorways)
+        ret = self.closed.get(key)
+        if ret == None:
+            occupancy, doorway_cells = self.room_grid(room)
+            ret = occupancy.copy()
+            for doorway, cells in doorway_cells.items():
+                if doorway not in open_doorways:
+                    ret.block_cells(cells)
+            self.closed[key] = ret
+        return ret
+
+    #tile of a world point on a grid
+    def tile(self, occupancy, point):
+        return (occupancy.tile_of(point[0], occupancy.bias_x), occupancy.tile_of(point[1], occupancy.bias_y))
+
+    #tiles from start to goal without leaving the room's grid, None if there's no such path
+    #occupancy overrides the room's grid (enemies or access tiles added to it), paths found on it aren't kept
+    def path(self, room, open_doorways, start, goal, occupancy = None):
+        key = (room, open_doorways, start, goal)
+        if occupancy == None and key in self.paths:
+            self.hits += 1
+            return self.paths[key]
+        self.misses += 1
+        grid = self.grid(room, open_doorways) if occupancy == None else occupancy
+        if not grid.in_bounds(start[0] - grid.origin_x, start[1] - grid.origin_y):
+            return None
+        search = JumpPointSearch(grid)
+        ret = search.plan(start, goal)
+        self.expanded_nodes = search.expanded_nodes
+        if occupancy == None:
+            self.paths[key] = ret
+        return ret
+
+    #moves between two places in a room in world units, each of a and b is a doorway (opened and left through its midpoint) or a point
+    #in the same units as the doorway graph's straight line heuristic, so it can weigh DoorwayGraph.route
+    def distance(self, room, a, b, midpoint):
+        open_doorways = frozenset(x for x in (a, b) if type(x) == Doorway)
+        occupancy = self.grid(room, open_doorways)
+        start = self.tile(occupancy, midpoint(a) if type(a) == Doorway else a)
+        goal = self.tile(occupancy, midpoint(b) if type(b) == Doorway else b)
+        path = self.path(room, open_doorways, start, goal)
+        return math.inf if path == None else (len(path) - 1) * occupancy.size
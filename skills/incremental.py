@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import math
+import numpy as np
+
+class DStarLite:
+    '''
+    D* Lite over the tiles of an OccupancyGrid, 4-connected with unit moves, a move costs nothing extra except that the tile moved onto has to be free.
+    The search runs backwards from the goal and keeps its g/rhs values between calls, so when the agent moves on or some tiles get blocked
+    or unblocked only the part of the search those changes affect gets repaired instead of searching the whole segment again.
+    Tiles are (x, y) integer tuples in the same tile coordinates as Navigator.to_tile.
+    '''
+
+    def __init__(self, occupancy, start, goal):
+        self.occupancy = occupancy
+        self.start = start
+        self.goal = goal
+        self.last = start #where the start was when km was last updated
+        self.km = 0 #how far the start has moved, added to the keys so the queue doesn't need reordering when it does
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.queue = [] #heap of (key, tie breaker, tile), entries whose key no longer matches self.keys are stale
+        self.keys = {} #tile -> the key it's currently queued with
+        self.counter = itertools.count()
+        self.expanded_nodes = 0 #expansions done by the last plan call
+        self.pending = set() #tiles a DynamicLayer reported as changed since the last update
+        self.push(goal)
+
+    #can the search carry on with this occupancy, only true if the tiles still mean the same thing
+    def compatible(self, occupancy):
+        return (occupancy.matches(self.occupancy.tile_bias, self.occupancy.tile_size) and occupancy.grid.shape == self.occupancy.grid.shape and
+            occupancy.origin_x == self.occupancy.origin_x and occupancy.origin_y == self.occupancy.origin_y)
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def neighbours(self, tile):
+        x, y = tile
+        return ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1))
+
+    #moving onto the goal is always allowed, just like the goal check happens before the collision check in Navigator.pathfind_astar
+    def free(self, tile):
+        return tile == self.goal or self.occupancy.is_free(tile)
+
+    def key(self, tile):
+        best = min(self.g.get(tile, math.inf), self.rhs.get(tile, math.inf))
+        return (best + self.heuristic(self.start, tile) + self.km, best)
+
+    def push(self, tile):
+        key = self.key(tile)
+        self.keys[tile] = key
+        heapq.heappush(self.queue, (key, next(self.counter), tile))
+
+    #the heap's smallest key that is still current, dropping stale entries off the top
+    def top_key(self):
+        while len(self.queue) > 0:
+            key, _, tile = self.queue[0]
+            if self.keys.get(tile) == key:
+                return key
+            heapq.heappop(self.queue)
+        return (math.inf, math.inf)
+
+    def update_vertex(self, tile):
+        if tile != self.goal:
+            best = math.inf
+            for neighbour in self.neighbours(tile):
+                if self.free(neighbour):
+                    best = min(best, 1 + self.g.get(neighbour, math.inf))
+            self.rhs[tile] = best
+        self.keys.pop(tile, None) #any queued entry goes stale
+        if self.g.get(tile, math.inf) != self.rhs.get(tile, math.inf):
+            self.push(tile)
+
+    def compute_shortest_path(self):
+        while (self.top_key() < self.key(self.start) or
+                self.rhs.get(self.start, math.inf) != self.g.get(self.start, math.inf)):
+            if len(self.queue) == 0: #nothing left to expand, the start can't reach the goal
+                break
+            old_key, _, tile = heapq.heappop(self.queue)
+            del self.keys[tile]
+            self.expanded_nodes += 1
+            new_key = self.key(tile)
+            g, rhs = self.g.get(tile, math.inf), self.rhs.get(tile, math.inf)
+            if old_key < new_key: #the start moved since this was queued
+                self.push(tile)
+            elif g > rhs: #overconsistent, settle it and pass the improvement on
+                self.g[tile] = rhs
+                if self.free(tile): #only a free tile can be moved onto by its neighbours
+                    for neighbour in self.neighbours(tile):
+                        self.update_vertex(neighbour)
+            else: #underconsistent, the tile got more expensive
+                self.g[tile] = math.inf
+                self.update_vertex(tile)
+                for neighbour in self.neighbours(tile):
+                    self.update_vertex(neighbour)
+
+    #the agent moved to a new tile
+    def move_start(self, start):
+        self.km += self.heuristic(self.last, start)
+        self.last = start
+        self.start = start
+
+    #subscriber for DynamicLayer, collects the tiles that changed until the next update
+    def cells_changed(self, blocked, freed):
+        self.pending.update(blocked)
+        self.pending.update(freed)
+
+    #switch to a new occupancy grid of the same shape, only the tiles that changed (and their neighbours) get looked at again
+    #changed can list the tiles that changed when the caller already knows them, otherwise the two grids are compared
+    def update(self, occupancy, changed = None):
+        if changed == None:
+            changed = [(int(i) + occupancy.origin_x, int(j) + occupancy.origin_y) for i, j in np.argwhere(occupancy.grid != self.occupancy.grid)]
+        changed = list(changed)
+        self.pending = set()
+        self.occupancy = occupancy
+        for tile in changed:
+            for neighbour in self.neighbours(tile): #only the tiles that can move onto this one are affected
+                self.update_vertex(neighbour)
+        return len(changed)
+
+    #repair the search and return the list of tiles from the start to the goal, None if the goal can't be reached
+    def plan(self):
+        self.expanded_nodes = 0
+        self.compute_shortest_path()
+        if self.g.get(self.start, math.inf) == math.inf:
+            return None
+        path = [self.start]
+        tile = self.start
+        while tile != self.goal:
+            best, best_cost = None, math.inf
+            for neighbour in self.neighbours(tile):
+                if self.free(neighbour) and 1 + self.g.get(neighbour, math.inf) < best_cost:
+                    best, best_cost = neighbour, 1 + self.g.get(neighbour, math.inf)
+            if best == None or len(path) > len(self.g) + 1: #shouldn't happen once the search is consistent, but never loop forever
+                return None
+            path.append(best)
+            tile = best
+        return path
@@ -0,0 +1,142 @@
+import bisect
+import heapq
+import itertools
+import math
+import numpy as np
+
+#the value in sorted values nearest to index in step's direction (index itself included), None if there's none
+def nearest(values, index, step):
+    if step > 0:
+        k = bisect.bisect_left(values, index)
+        return values[k] if k < len(values) else None
+    k = bisect.bisect_right(values, index) - 1
+    return values[k] if k >= 0 else None
+
+class JumpPointSearch:
+    '''
+    Jump Point Search over the tiles of an OccupancyGrid, 4-connected with unit moves like Navigator.pathfind_astar.
+    Instead of pushing every tile of an open room onto the heap, a search keeps sliding in a straight line until it reaches the goal
+    or a tile where the shortest paths could branch (a wall corner opens up beside it), and only those jump points get expanded.
+    Vertical jumps also look sideways, so horizontal runs are only started from jump points, which is what keeps the pruning exact.
+    Where horizontal jumps stop is worked out a whole row at a time with NumPy, so they cost two lookups instead of a walk.
+    Tiles are (x, y) integer tuples in the same tile coordinates as Navigator.to_tile.
+    '''
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy
+        self.goal = None
+        self.expanded_nodes = 0 #jump points expanded by the last plan call
+
+    #the free tiles (with the goal always free) padded with a blocked border, rows of jump tables get filled in as the search reaches them
+    def prepare(self, goal):
+        self.goal = goal
+        self.goal_index = (goal[0] - self.occupancy.origin_x, goal[1] - self.occupancy.origin_y)
+        self.free = np.pad(~self.occupancy.grid, 1, constant_values = False) #indexed [i + 1, j + 1], outside the map counts as blocked
+        if self.occupancy.in_bounds(*self.goal_index): #moving onto the goal is always allowed, like the goal check before the collision check in pathfind_astar
+            self.free[self.goal_index[0] + 1, self.goal_index[1] + 1] = True
+        self.rows = {}
+
+    #for one row of the grid, the columns a jump east or west would stop at and the blocked columns, computed once per row
+    def row(self, j):
+        tables = self.rows.get(j)
+        if tables == None:
+            free, line, north, south = self.free, self.free[1:-1, j + 1], self.free[1:-1, j + 2], self.free[1:-1, j]
+            goal = np.zeros(len(line), dtype = bool)
+            if self.goal_index[1] == j and 0 <= self.goal_index[0] < len(line):
+                goal[self.goal_index[0]] = True
+            #a tile above or below opened up that was blocked one step back
+            forced_east = line & ((north & ~free[:-2, j + 2]) | (south & ~free[:-2, j]))
+            forced_west = line & ((north & ~free[2:, j + 2]) | (south & ~free[2:, j]))
+            walls = np.flatnonzero(~line).tolist()
+            tables = {1: (np.flatnonzero(forced_east | goal).tolist(), walls), -1: (np.flatnonzero(forced_west | goal).tolist(), walls)}
+            self.rows[j] = tables
+        return tables
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    #grid index of the jump point found sliding along row j from column i by dx (i itself excluded), None if a blocked tile comes first
+    def jump_horizontal(self, i, j, dx):
+        stops, walls = self.row(j)[dx]
+        stop, wall = nearest(stops, i + dx, dx), nearest(walls, i + dx, dx)
+        if stop == None or (wall != None and (stop - wall) * dx > 0): #the wall comes first
+            return None
+        return stop
+
+    #grid index of the jump point found sliding along column i from row j by dy, stopping wherever a horizontal jump would find something
+    def jump_vertical(self, i, j, dy):
+        free = self.free
+        while True:
+            j += dy
+            if not free[i + 1, j + 1]:
+                return None
+            if (i, j) == self.goal_index:
+                return j
+            if (free[i + 2, j + 1] and not free[i + 2, j + 1 - dy]) or (free[i, j + 1] and not free[i, j + 1 - dy]): #a tile beside opened up
+                return j
+            if self.jump_horizontal(i, j, 1) != None or self.jump_horizontal(i, j, -1) != None:
+                return j
+
+    #slide from tile in direction until a jump point, None if a blocked tile comes first
+    def jump(self, tile, direction):
+        i, j = tile[0] - self.occupancy.origin_x, tile[1] - self.occupancy.origin_y
+        if direction[0] != 0:
+            stop = self.jump_horizontal(i, j, direction[0])
+            return None if stop == None else (stop + self.occupancy.origin_x, tile[1])
+        stop = self.jump_vertical(i, j, direction[1])
+        return None if stop == None else (tile[0], stop + self.occupancy.origin_y)
+
+    #the directions worth jumping in from tile, given the direction it was reached in
+    def directions(self, tile, parent):
+        if parent == None:
+            return ((1, 0), (-1, 0), (0, 1), (0, -1))
+        dx = (tile[0] > parent[0]) - (tile[0] < parent[0])
+        dy = (tile[1] > parent[1]) - (tile[1] < parent[1])
+        if dx != 0:
+            return ((dx, 0), (0, 1), (0, -1))
+        return ((0, dy), (1, 0), (-1, 0))
+
+    #returns the list of tiles from start to goal, None if the goal can't be reached
+    def plan(self, start, goal):
+        self.prepare(goal)
+        self.expanded_nodes = 0
+        counter = itertools.count()
+        costs = {start: 0}
+        parents = {start: None}
+        closed = set()
+        frontier = [(self.heuristic(start, goal), next(counter), start)]
+        while len(frontier) > 0:
+            tile = heapq.heappop(frontier)[2]
+            if tile in closed: #stale heap entry
+                continue
+            if tile == goal:
+                return self.expand(parents, tile)
+            closed.add(tile)
+            self.expanded_nodes += 1
+            for direction in self.directions(tile, parents[tile]):
+                jump_point = self.jump(tile, direction)
+                if jump_point == None or jump_point in closed:
+                    continue
+                cost = costs[tile] + self.heuristic(tile, jump_point) #jumps are straight, so their length is the manhattan distance
+                if cost < costs.get(jump_point, math.inf):
+                    costs[jump_point] = cost
+                    parents[jump_point] = tile
+                    heapq.heappush(frontier, (cost + self.heuristic(jump_point, goal), next(counter), jump_point))
+        return None
+
+    #fill in the tiles between consecutive jump points
+    def expand(self, parents, tile):
+        jump_points = [tile]
+        while parents[tile] != None:
+            tile = parents[tile]
+            jump_points.append(tile)
+        jump_points.reverse()
+        path = [jump_points[0]]
+        for a, b in zip(jump_points, jump_points[1:]):
+            dx = (b[0] > a[0]) - (b[0] < a[0])
+            dy = (b[1] > a[1]) - (b[1] < a[1])
+            x, y = a
+            while (x, y) != b:
+                x, y = x + dx, y + dy
+                path.append((x, y))
+        return path
@@ -0,0 +1,170 @@
+'''
+Persistent cache of processed maps (walls, their corners, doorways with the rooms on either side, rooms), keyed by a hash of walls_raw.
+Navigator(map_cache = True) (or a directory) has setup_map load from here instead of rebuilding the map, and write back whatever it had to build itself.
+The key leaves the spawn point out, a map is assumed to be connected so discovering it from anywhere inside gives the same rooms
+(setup_map builds the map again when the agent isn't in any of the cached map's rooms).
+Maps can be precompiled ahead of time from a JSON dump of the walls (a list of {"x1", "y1", "x2", "y2"} dicts, or a feature vector containing one):
+    python -m skills.map_cache walls.json [--start X Y] [--cache-dir DIR] [--backend decimal|float]
+--start is needed unless the JSON is a feature vector with the player's position in it.
+'''
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from skills.doorways import *
+from skills.tracing import trace
+
+CACHE_VERSION = 2 #bump whenever the processed map or its format changes so stale entries are ignored
+
+#NAVIGATION_MAP_CACHE overrides where the cache lives
+def default_cache_dir():
+    return os.environ.get("NAVIGATION_MAP_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "vizdoom_navigation"))
+
+#content hash of the raw walls, the geometry backend is part of the key since corners are stored at the backend's precision
+def walls_hash(walls_raw):
+    canonical = [[str(raw["x1"]), str(raw["y1"]), str(raw["x2"]), str(raw["y2"])] for raw in walls_raw]
+    payload = json.dumps([CACHE_VERSION, backend.name, canonical], separators = (",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cache_path(walls_raw, cache_dir):
+    return os.path.join(cache_dir, walls_hash(walls_raw) + ".json.gz")
+
+#every line the map refers to: the walls, the doorways, plus any discarded doorways still sitting in the corners of other lines
+def referenced_lines(navigator):
+    lines = list(navigator.walls) + list(navigator.doorways)
+    seen = set(lines)
+    i = 0
+    while i < len(lines):
+        for dicti in (lines[i].corners, lines[i].doorway_corners):
+            for others in dicti.values():
+                for line in others:
+                    if line not in seen:
+                        seen.add(line)
+                        lines.append(line)
+        i += 1
+    for others in navigator.map_corners.values():
+        for line in others:
+            if line not in seen:
+                seen.add(line)
+                lines.append(line)
+    return lines
+
+#flatten the navigator's processed map into plain lists, every line and room is referred to by its index
+def serialize_map(navigator):
+    lines = referenced_lines(navigator)
+    ids = {line: i for i, line in enumerate(lines)}
+    rooms = list(navigator.rooms)
+    room_ids = {room: i for i, room in enumerate(rooms)}
+
+    def point(c):
+        return [str(c.x), str(c.y)]
+    def corners(dicti):
+        return [point(c) + [[ids[line] for line in others]] for c, others in dicti.items()]
+
+    return {
+        "version": CACHE_VERSION,
+        "max_x": str(navigator.max_x),
+        "lines": [point(line.coords[0]) + point(line.coords[1]) for line in lines],
+        "doorway_lines": [i for i, line in enumerate(lines) if type(line) == Doorway], #everything else is a Wall
+        "wall_count": len(navigator.walls), #the first wall_count lines are the walls
+        "doorway_count": len(navigator.doorways), #followed by the doorways, anything after is only referenced by corners
+        "corners": [corners(line.corners) for line in lines],
+        "doorway_corners": [corners(line.doorway_corners) for line in lines],
+        "map_corners": corners(navigator.map_corners),
+        "rooms": [[[ids[d] for d in room.doorways], [ids[w] for w in room.walls]] for room in rooms],
+        "room_corners": [[point(c) for c in room.corners] for room in rooms],
+        "doorway_rooms": [[room_ids.get(line.room_l), room_ids.get(line.room_r)] for line in lines if type(line) == Doorway],
+    }
+
+#rebuild the lines, corners, doorways and rooms from serialize_map's output onto the navigator
+def deserialize_map(navigator, data):
+    def point(c):
+        return coord_tuple(backend.number(c[0]), backend.number(c[1]))
+
+    doorway_lines = set(data["doorway_lines"])
+    lines = []
+    for i, raw in enumerate(data["lines"]):
+        line_type = Doorway if i in doorway_lines else Wall
+        lines.append(line_type(point(raw[0:2]), point(raw[2:4])))
+    for line, corners, doorway_corners in zip(lines, data["corners"], data["doorway_corners"]):
+        for corner in corners:
+            line.corners[point(corner)] = {lines[i] for i in corner[2]}
+        for corner in doorway_corners:
+            line.doorway_corners[point(corner)] = {lines[i] for i in corner[2]}
+
+    rooms = []
+    for (doorway_ids, wall_ids), corners in zip(data["rooms"], data["room_corners"]):
+        room = Room()
+        room.doorways = {lines[i] for i in doorway_ids}
+        room.walls = {lines[i] for i in wall_ids}
+        room.corners = [point(c) for c in corners]
+        rooms.append(room)
+    for i, (room_l, room_r) in zip(data["doorway_lines"], data["doorway_rooms"]):
+        lines[i].room_l = rooms[room_l] if room_l != None else None
+        lines[i].room_r = rooms[room_r] if room_r != None else None
+
+    wall_count, doorway_count = data["wall_count"], data["doorway_count"]
+    navigator.max_x = backend.number(data["max_x"])
+    navigator.walls = set(lines[:wall_count])
+    navigator.doorways = set(lines[wall_count:wall_count + doorway_count])
+    navigator.rooms = set(rooms)
+    navigator.map_corners = {point(corner): [lines[i] for i in corner[2]] for corner in data["map_corners"]}
+
+#load the navigator's map from the cache, returns False if it isn't cached (or the entry can't be read)
+def load_map(navigator, cache_dir):
+    path = cache_path(navigator.walls_raw, cache_dir)
+    if not os.path.exists(path):
+        return False
+    try:
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            return False
+        deserialize_map(navigator, data)
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        trace.map.error("ignoring unreadable map cache %s: %s", path, e)
+        return False
+    return True
+
+def save_map(navigator, cache_dir):
+    path = cache_path(navigator.walls_raw, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok = True)
+        temp = f"{path}.{os.getpid()}.tmp" #write then rename so other processes never see a half written entry
+        with gzip.open(temp, "wt") as f:
+            json.dump(serialize_map(navigator), f, separators = (",", ":"))
+        os.replace(temp, path)
+    except OSError as e:
+        trace.map.error("couldn't write map cache %s: %s", path, e)
+        return None
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("walls", help = "JSON file with the walls, or a feature vector that has them under 'walls'")
+    parser.add_argument("--start", type = float, nargs = 2, metavar = ("X", "Y"),
+        help = "a point inside the map, defaults to the player's position in a feature vector")
+    parser.add_argument("--cache-dir", default = default_cache_dir())
+    parser.add_argument("--backend", choices = ("decimal", "float"), default = "decimal")
+    args = parser.parse_args()
+
+    with open(args.walls) as f:
+        data = json.load(f)
+    walls = data["walls"] if isinstance(data, dict) else data
+    if args.start != None:
+        start = args.start
+    elif isinstance(data, dict) and "player" in data:
+        start = (data["player"]["x_position"], data["player"]["y_position"])
+    else: #the map is discovered from the start, there's no point that's inside every map
+        parser.error("--start is required when the walls don't come with the player's position")
+
+    from skills.Navigation import Navigator #imported here since Navigation imports this module
+    navigator = Navigator(geometry_backend = args.backend, map_cache = args.cache_dir)
+    navigator.update_features({"enemies": [], "items": {"obstacle": []}, "walls": walls,
+        "player": {"x_position": start[0], "y_position": start[1], "angle": 0}})
+    path = save_map(navigator, args.cache_dir)
+    print(f"{len(navigator.walls)} walls, {len(navigator.doorways)} doorways, {len(navigator.rooms)} rooms -> {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import types
+import weakref
+import numpy as np
+from skills.doorways import *
+from skills.spatial import SpatialHash, RoomIndex
+from skills.routing import DoorwayGraph
+from skills.corners import CornerTable
+from skills.map_cache import walls_hash, referenced_lines
+
+class NavMap:
+    '''
+    The static part of a map once setup_map has interpreted it: the walls, doorways, rooms and map corners, the map's right edge,
+    the spatial hash over the lines, the room index, the doorway graph and the corner table every line's corners are compacted into. None of it changes after it's built, so any number of Navigators
+    (several agents, evaluation copies) can reference one NavMap and keep only their own dynamic layers (enemies, access tiles, path state).
+    Navigators given the same walls in one process find the map another one already built through NavMap.loaded. Like the map cache this is keyed
+    by the walls alone and assumes the map is connected, Navigator.setup_map checks the agent is in one of the found map's rooms before using it.
+    '''
+
+    loaded = weakref.WeakValueDictionary() #walls hash -> NavMap, kept for as long as some navigator still uses it
+
+    def __init__(self, walls, doorways, rooms, map_corners, max_x, walls_raw = None, line_index = None, unit = 16.0076, player_radius = 16):
+        self.walls = frozenset(walls)
+        self.doorways = frozenset(doorways)
+        self.rooms = frozenset(rooms)
+        self.map_corners = types.MappingProxyType({corner: tuple(lines) for corner, lines in map_corners.items()})
+        self.max_x = max_x
+        self.walls_raw = walls_raw #what the map was built from, None if it isn't known
+        self.line_index = line_index if line_index != None else SpatialHash(lines = self.walls.union(self.doorways))
+        self.lines = tuple(self.walls) + tuple(self.doorways) #the rows of segments
+        self.line_rows = {line: i for i, line in enumerate(self.lines)}
+        self.segments = segments_array(self.lines) #(n, 4) every wall and doorway, for checking many points against the map at once
+        self.segment_low = np.minimum(self.segments[:, 0:2], self.segments[:, 2:4]) #their bounding boxes
+        self.segment_high = np.maximum(self.segments[:, 0:2], self.segments[:, 2:4])
+        self.room_index = RoomIndex(self.rooms)
+        self.doorway_graph = DoorwayGraph(self.rooms, self.line_index, float(unit), player_radius)
+        self.corner_table = CornerTable(referenced_lines(self))
+        self.corner_table.compact_lines()
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("frozen") == True:
+            raise AttributeError(f"NavMap is shared between navigators and can't be changed, tried to set {name}")
+        object.__setattr__(self, name, value)
+
+    #the map built from these walls by a navigator in this process, None if there's none (or it's no longer used)
+    @classmethod
+    def find(cls, walls_raw):
+        return cls.loaded.get(walls_hash(walls_raw))
+
+    #make this map the one find returns for its walls
+    def register(self):
+        if self.walls_raw:
+            NavMap.loaded[walls_hash(self.walls_raw)] = self
+        return self
@@ -0,0 +1,221 @@
+import numpy as np
+from skills.geometry import *
+
+class OccupancyGrid:
+    '''
+    The map rasterized at tile resolution into a NumPy boolean array, True meaning the agent can't stand on that tile.
+    Tiles line up with Navigator.to_tile: tile t covers [tile_bias + t * tile_size, tile_bias + (t + 1) * tile_size) and the agent stands at its center,
+    so stamping things with the player's radius (a Minkowski sum) turns every collision check into a single array lookup.
+    '''
+
+    def __init__(self, tile_bias, tile_size, bounds, margin = 0):
+        self.tile_bias = tile_bias
+        self.tile_size = tile_size
+        self.bias_x, self.bias_y, self.size = float(tile_bias.x), float(tile_bias.y), float(tile_size)
+        min_x, min_y, max_x, max_y = bounds #world coordinates the grid has to cover
+        self.origin_x = self.tile_of(min_x - margin, self.bias_x) #tile coordinates of grid[0, 0]
+        self.origin_y = self.tile_of(min_y - margin, self.bias_y)
+        width = self.tile_of(max_x + margin, self.bias_x) - self.origin_x + 1
+        height = self.tile_of(max_y + margin, self.bias_y) - self.origin_y + 1
+        self.grid = np.zeros((width, height), dtype = bool) #indexed [tile x - origin_x, tile y - origin_y]
+        self.obstacle_count = 0 #how many obstacles have been stamped, lets the owner notice when new ones show up
+
+    def tile_of(self, coord, bias):
+        return math.floor((float(coord) - bias) / self.size)
+
+    def matches(self, tile_bias, tile_size):
+        return self.tile_bias == tile_bias and self.tile_size == tile_size
+
+    def copy(self):
+        ret = object.__new__(OccupancyGrid)
+        ret.__dict__.update(self.__dict__)
+        ret.grid = self.grid.copy()
+        return ret
+
+    def in_bounds(self, i, j):
+        return 0 <= i < self.grid.shape[0] and 0 <= j < self.grid.shape[1]
+
+    #is the agent allowed on this tile, anything outside the map counts as blocked
+    def is_free(self, tile):
+        i = int(tile[0]) - self.origin_x
+        j = int(tile[1]) - self.origin_y
+        return 0 <= i < self.grid.shape[0] and 0 <= j < self.grid.shape[1] and not self.grid[i, j]
+
+    def block(self, tile):
+        i = int(tile[0]) - self.origin_x
+        j = int(tile[1]) - self.origin_y
+        if self.in_bounds(i, j):
+            self.grid[i, j] = True
+
+    #world coordinates of the centers of tiles [i0, i1) x [j0, j1) in grid indices, broadcastable against each other
+    def centers(self, i0, i1, j0, j1):
+        xs = self.bias_x + (np.arange(i0, i1) + self.origin_x + 0.5) * self.size
+        ys = self.bias_y + (np.arange(j0, j1) + self.origin_y + 0.5) * self.size
+        return xs[:, None], ys[None, :]
+
+    #grid index window covering a bounding box grown by radius, clipped to the grid
+    def window(self, min_x, min_y, max_x, max_y, radius):
+        i0 = max(self.tile_of(min_x - radius, self.bias_x) - self.origin_x, 0)
+        j0 = max(self.tile_of(min_y - radius, self.bias_y) - self.origin_y, 0)
+        i1 = min(self.tile_of(max_x + radius, self.bias_x) - self.origin_x + 1, self.grid.shape[0])
+        j1 = min(self.tile_of(max_y + radius, self.bias_y) - self.origin_y + 1, self.grid.shape[1])
+        return i0, i1, j0, j1
+
+    #boolean mask (over the window) of tiles whose centers are closer than radius to the segment [x1, y1, x2, y2]
+    def segment_mask(self, segment, radius):
+        x1, y1, x2, y2 = segment
+        i0, i1, j0, j1 = self.window(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2), radius)
+        if i0 >= i1 or j0 >= j1:
+            return (i0, i1, j0, j1), np.zeros((0, 0), dtype = bool)
+        xs, ys = self.centers(i0, i1, j0, j1)
+        dx, dy = x2 - x1, y2 - y1
+        length_squared = dx * dx + dy * dy
+        if length_squared == 0:
+            t = 0
+        else:
+            t = np.clip(((xs - x1) * dx + (ys - y1) * dy) / length_squared, 0, 1)
+        return (i0, i1, j0, j1), np.hypot(xs - (x1 + t * dx), ys - (y1 + t * dy)) < radius
+
+    #block every tile whose center is closer than radius to any of the segments, segments is an (n, 4) array
+    def stamp_segments(self, segments, radius):
+        for segment in segments:
+            (i0, i1, j0, j1), mask = self.segment_mask(segment, radius)
+            if mask.size > 0:
+                self.grid[i0:i1, j0:j1] |= mask
+
+    #block every tile whose center is closer than radius to any of the points, points is an (n, 2) array
+    def stamp_points(self, points, radius):
+        for x, y in points:
+            self.stamp_segments(((x, y, x, y),), radius)
+
+    '''
+    Every tile the segments (an (n, 4) array) pass through, as an (m, 2) int64 array of tile coordinates (a tile can appear more than once).
+    This is a supercover done one tile column at a time for all the segments together: each segment is split at the column boundaries it crosses,
+    and each piece covers the rows between the y values at its two ends, so steep lines don't skip tiles the way sampling along x does.
+    Tile edges count as touched, and radius (world units) grows every piece by that much each way, a square around the segment rather than a disk.
+    '''
+    def supercover(self, segments, radius = 0):
+        segments = np.asarray(segments, dtype = np.float64).reshape(-1, 4)
+        x1, y1, x2, y2 = segments.T
+        left, right = np.minimum(x1, x2), np.maximum(x1, x2)
+        first = np.floor((left - radius - self.bias_x) / self.size).astype(np.int64)
+        last = np.floor((right + radius - self.bias_x) / self.size).astype(np.int64)
+        counts = last - first + 1
+
+        #one row per (segment, column), the part of the segment inside the column, clamped to the segment's own ends
+        index = np.repeat(np.arange(len(segments)), counts)
+        column = first[index] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        low = np.clip(self.bias_x + column * self.size, left[index], right[index])
+        high = np.clip(self.bias_x + (column + 1) * self.size, left[index], right[index])
+        dx, dy = (x2 - x1)[index], (y2 - y1)[index]
+        vertical = dx == 0
+        slope = np.divide(dy, dx, out = np.zeros_like(dy), where = ~vertical)
+        y_low = np.where(vertical, np.minimum(y1, y2)[index], y1[index] + (low - x1[index]) * slope)
+        y_high = np.where(vertical, np.maximum(y1, y2)[index], y1[index] + (high - x1[index]) * slope)
+        bottom = np.floor((np.minimum(y_low, y_high) - radius - self.bias_y) / self.size).astype(np.int64)
+        top = np.floor((np.maximum(y_low, y_high) + radius - self.bias_y) / self.size).astype(np.int64)
+
+        #then one row per tile
+        counts = top - bottom + 1
+        piece = np.repeat(np.arange(len(column)), counts)
+        row = bottom[piece] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.column_stack((column[piece], row))
+
+    #block every tile the segments pass through (grown by radius), the tiles outside the grid are left out
+    def stamp_supercover(self, segments, radius = 0):
+        tiles = self.supercover(segments, radius)
+        i, j = tiles[:, 0] - self.origin_x, tiles[:, 1] - self.origin_y
+        inside = (i >= 0) & (i < self.grid.shape[0]) & (j >= 0) & (j < self.grid.shape[1])
+        self.grid[i[inside], j[inside]] = True
+
+    #flat grid indices of the tiles a segment blocks, so a line can be switched on and off later without redoing the geometry
+    def segment_cells(self, segment, radius):
+        (i0, i1, j0, j1), mask = self.segment_mask(segment, radius)
+        i, j = np.nonzero(mask)
+        return np.ravel_multi_index((i + i0, j + j0), self.grid.shape)
+
+    def block_cells(self, cells):
+        self.grid.flat[cells] = True
+
+class DynamicLayer:
+    '''
+    Cells blocked by moving entities (enemies) over the same tiles as an OccupancyGrid, kept as a count of the footprints covering each cell.
+    Every frame only the entities that moved get their footprint restamped, and subscribers are told which cells became blocked or free,
+    so the cost of a frame follows how much the entities moved rather than how many there are.
+    '''
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy #only used for its tile layout
+        self.counts = np.zeros(occupancy.grid.shape, dtype = np.int16) #how many footprints cover each cell
+        self.footprints = {} #entity key -> (position, flat cell indices it covers)
+        self.subscribers = [] #callables taking (newly blocked tiles, newly freed tiles)
+
+    #does this layer use the same tiles as the occupancy grid
+    def matches(self, occupancy):
+        return (occupancy.matches(self.occupancy.tile_bias, self.occupancy.tile_size) and occupancy.grid.shape == self.counts.shape and
+            occupancy.origin_x == self.occupancy.origin_x and occupancy.origin_y == self.occupancy.origin_y)
+
+    #a layer with the same footprints and no subscribers, updating either one leaves the other alone
+    def copy(self):
+        ret = object.__new__(DynamicLayer)
+        ret.occupancy, ret.counts, ret.footprints, ret.subscribers = self.occupancy, self.counts.copy(), dict(self.footprints), []
+        return ret
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    @property
+    def blocked(self):
+        return self.counts > 0
+
+    def is_blocked(self, tile):
+        i = int(tile[0]) - self.occupancy.origin_x
+        j = int(tile[1]) - self.occupancy.origin_y
+        return self.occupancy.in_bounds(i, j) and self.counts[i, j] > 0
+
+    #(x, y) tile coordinates of flat cell indices
+    def tiles(self, cells):
+        i, j = np.unravel_index(cells, self.counts.shape)
+        return [(int(x) + self.occupancy.origin_x, int(y) + self.occupancy.origin_y) for x, y in zip(i, j)]
+
+    #move the entities to their new positions, keys identify an entity between frames, returns the (blocked, freed) tiles
+    def update(self, keys, positions, radius):
+        added, removed = [], []
+        current = {}
+        for key, (x, y) in zip(keys, positions):
+            position = (float(x), float(y))
+            old = self.footprints.get(key)
+            if old != None and old[0] == position: #hasn't moved, its cells stay as they are
+                current[key] = old
+                continue
+            cells = self.occupancy.segment_cells((position[0], position[1], position[0], position[1]), radius)
+            current[key] = (position, cells)
+            if old != None and np.array_equal(cells, old[1]): #moved within the same tiles
+                continue
+            added.append(cells)
+            if old != None:
+                removed.append(old[1])
+        for key, (position, cells) in self.footprints.items(): #entities that are gone
+            if key not in current:
+                removed.append(cells)
+        self.footprints = current
+        if len(added) == 0 and len(removed) == 0:
+            return [], []
+
+        touched = np.concatenate(added + removed)
+        flat = self.counts.reshape(-1)
+        before = flat[touched] > 0
+        for cells in added: #a footprint never lists a cell twice, so plain fancy indexing is enough
+            flat[cells] += 1
+        for cells in removed:
+            flat[cells] -= 1
+        after = flat[touched] > 0
+        blocked, freed = self.tiles(np.unique(touched[after & ~before])), self.tiles(np.unique(touched[before & ~after]))
+        if len(blocked) > 0 or len(freed) > 0:
+            for callback in self.subscribers:
+                callback(blocked, freed)
+        return blocked, freed
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+class PathCache:
+    '''
+    Bounded least recently used cache of planned paths, (path_tiles, path_actions) keyed by start tile, goal tile and tile layout.
+    Every entry remembers the version of the blocked tiles it was planned against, the owner bumps the version whenever walls, obstacles
+    or access tiles change, so an entry from an older version is dropped instead of returned.
+    Agents keep heading to the same places (spawn points, items, the center of the map), so most journeys after the first are lookups.
+    '''
+
+    def __init__(self, capacity = 128):
+        self.capacity = capacity #entries kept before the least recently used one is evicted, 0 turns the cache off
+        self.entries = OrderedDict() #key -> (version, path_tiles, path_actions), the most recently used last
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0 #lookups that found an entry from an older version
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    #the cached (path_tiles, path_actions) as fresh lists (travel_to pops from them), None on a miss
+    #usable(path_tiles) can turn a hit down (something is standing on the path right now), the entry is kept for later
+    def get(self, key, version, usable = None):
+        entry = self.entries.get(key)
+        if entry != None and entry[0] != version:
+            del self.entries[key]
+            self.invalidations += 1
+            entry = None
+        if entry == None or (usable != None and not usable(entry[1])):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(entry[1]), list(entry[2])
+
+    def put(self, key, version, path_tiles, path_actions):
+        if self.capacity <= 0:
+            return
+        self.entries[key] = (version, tuple(path_tiles), tuple(path_actions))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups > 0 else None,
+            "invalidations": self.invalidations, "evictions": self.evictions, "size": len(self.entries), "capacity": self.capacity}
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+from skills.doorways import *
+from skills.hierarchy import RoomPaths
+from skills.entities import EntityStore
+
+class DoorwayGraph:
+    '''
+    Weighted graph over the doorways of the map, two doorways are connected when they open into the same room,
+    weighted by the moves it takes to walk between their midpoints inside that room, searched on the room's own grid of the static walls.
+    Built once per map in setup_map, so routing between rooms is a shortest path search over it instead of a search for the fewest rooms.
+    Without a line_index (or where the tiles are too coarse to get between two doorways) the straight line distance between the midpoints is used instead.
+    '''
+
+    def __init__(self, rooms = None, line_index = None, tile_size = 16.0076, player_radius = 16):
+        self.edges = {} #doorway -> {doorway sharing a room with it: moves between their midpoints inside the room}
+        self.shared = {} #(room, room) -> the shortest doorway between them, both orders are stored
+        self.midpoints = {} #doorway -> midpoint as floats
+        self.room_paths = None #room grids without obstacles at a fixed tile layout, only used to weigh the edges
+        if line_index != None:
+            self.room_paths = RoomPaths(line_index, player_radius)
+            self.room_paths.set_layout(coord_tuple(0.0, 0.0), tile_size, EntityStore())
+        if rooms != None:
+            for room in rooms:
+                self.add_room(room)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def midpoint(self, doorway):
+        ret = self.midpoints.get(doorway)
+        if ret == None:
+            mid = doorway.midpoint()
+            ret = self.midpoints[doorway] = (float(mid.x), float(mid.y))
+        return ret
+
+    def distance(self, a, b):
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+    def add_room(self, room):
+        doorways = list(room.doorways)
+        for doorway in doorways:
+            self.edges.setdefault(doorway, {})
+            other = room.adjacent_room(doorway)
+            if other != None:
+                best = self.shared.get((room, other))
+                if best == None or doorway.length < best.length:
+                    self.shared[(room, other)] = doorway
+                    self.shared[(other, room)] = doorway
+        for a, b in itertools.combinations(doorways, 2):
+            weight = self.travel(room, a, b)
+            self.edges[a][b] = weight
+            self.edges[b][a] = weight
+
+    #moves between the midpoints of two of a room's doorways, the straight line when there's no room grid or no path on it
+    def travel(self, room, a, b):
+        ret = math.inf if self.room_paths == None else self.room_paths.distance(room, a, b, self.midpoint)
+        return ret if ret < math.inf else self.distance(self.midpoint(a), self.midpoint(b))
+
+    #the doorway connecting two neighbouring rooms, None if they don't touch
+    def shared_doorway(self, room, other):
+        return self.shared.get((room, other))
+
+    #A* over the doorways from a point in start_room to a point in destination_room, returns the rooms passed through and the doorways between them
+    #weigh(room, a, b) replaces the precomputed weights (and the straight line legs to and from the points) with the travel inside room between a and b (each a doorway or a point), math.inf if there's no way
+    def route(self, start_room, start_coords, destination_room, destination_coords, weigh = None):
+        if start_room == destination_room:
+            return [destination_room], []
+        start = (float(start_coords[0]), float(start_coords[1]))
+        goal = (float(destination_coords[0]), float(destination_coords[1]))
+        counter = itertools.count() #tie breaker so the heap never compares doorways
+        frontier = [] #heap of (f, tie breaker, (doorway just crossed, room it led into))
+        costs = {}
+        parents = {}
+        for doorway in start_room.doorways: #every doorway of the starting room is reachable straight from the start
+            node = (doorway, start_room.adjacent_room(doorway))
+            cost = self.distance(start, self.midpoint(doorway)) if weigh == None else weigh(start_room, start, doorway)
+            if cost < costs.get(node, math.inf):
+                costs[node] = cost
+                parents[node] = None
+                heapq.heappush(frontier, (cost + self.distance(self.midpoint(doorway), goal), next(counter), node))
+        closed = set()
+        arrived = set() #nodes in the destination room pushed back with their final leg weighed in
+        while len(frontier) > 0:
+            node = heapq.heappop(frontier)[2]
+            if node in closed:
+                continue
+            doorway, room = node
+            if room == destination_room: #the heuristic is the exact final leg here, so the first such node popped is the best route
+                if weigh == None or node in arrived:
+                    return self.reconstruct(start_room, parents, node)
+                arrived.add(node)
+                leg = weigh(room, doorway, goal)
+                if leg < math.inf:
+                    heapq.heappush(frontier, (costs[node] + leg, next(counter), node))
+                continue
+            closed.add(node)
+            if room == None:
+                continue
+            for other in room.doorways:
+                if other == doorway:
+                    continue
+                neighbour = (other, room.adjacent_room(other))
+                cost = costs[node] + (self.edges[doorway][other] if weigh == None else weigh(room, doorway, other))
+                if neighbour not in closed and cost < costs.get(neighbour, math.inf):
+                    costs[neighbour] = cost
+                    parents[neighbour] = node
+                    heapq.heappush(frontier, (cost + self.distance(self.midpoint(other), goal), next(counter), neighbour))
+        return [], []
+
+    def reconstruct(self, start_room, parents, node):
+        rooms, doorways = [], []
+        while node != None:
+            doorways.append(node[0])
+            rooms.append(node[1])
+            node = parents[node]
+        rooms.append(start_room)
+        rooms.reverse()
+        doorways.reverse()
+        return rooms, doorways
@@ -0,0 +1,154 @@
+from skills.geometry import *
+
+class SpatialHash:
+    '''
+    Uniform grid of buckets over the map, each bucket (keyed by its cell coordinates) holds the lines passing through that cell.
+    Lets collision checks and rays look at only the lines close to them instead of every wall and doorway on the map.
+    '''
+
+    def __init__(self, cell_size = 64, lines = None):
+        self.cell_size = float(cell_size)
+        self.cells = {} #(cell x, cell y) -> set of lines passing through that cell
+        if lines != None:
+            for line in lines:
+                self.insert(line)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def cell(self, x, y):
+        return math.floor(float(x) / self.cell_size), math.floor(float(y) / self.cell_size)
+
+    def insert(self, line):
+        for key in self.segment_cells(line.coords[0], line.coords[1]):
+            bucket = self.cells.get(key)
+            if bucket == None:
+                self.cells[key] = {line}
+            else:
+                bucket.add(line)
+
+    def remove(self, line):
+        for key in self.segment_cells(line.coords[0], line.coords[1]):
+            bucket = self.cells.get(key)
+            if bucket != None:
+                bucket.discard(line)
+
+    #every line with a bucket within radius of the point, callers still need to check the actual distance
+    def query(self, point, radius = 0):
+        min_x, min_y = self.cell(float(point[0]) - radius, float(point[1]) - radius)
+        max_x, max_y = self.cell(float(point[0]) + radius, float(point[1]) + radius)
+        ret = set()
+        for i in range(min_x, max_x + 1):
+            for j in range(min_y, max_y + 1):
+                bucket = self.cells.get((i, j))
+                if bucket != None:
+                    ret.update(bucket)
+        return ret
+
+    #every line sharing a bucket with the segment from a to b, padding keeps lines that only touch the segment's ends
+    def query_segment(self, a, b, padding = 1):
+        ret = set()
+        for key in self.segment_cells(a, b, padding):
+            bucket = self.cells.get(key)
+            if bucket != None:
+                ret.update(bucket)
+        return ret
+
+    #the cells a segment passes through, walking column by column so long diagonals don't cover their whole bounding box
+    def segment_cells(self, a, b, padding = 0):
+        x1, y1, x2, y2 = float(a[0]), float(a[1]), float(b[0]), float(b[1])
+        if x1 > x2: #always walk from left to right
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        first_column = self.cell(x1 - padding, 0)[0]
+        last_column = self.cell(x2 + padding, 0)[0]
+        cells = []
+        for column in range(first_column, last_column + 1):
+            if x1 == x2: #vertical segment, the whole y range sits in this column
+                low_y, high_y = y1, y2
+            else: #clip the segment to the x range of this column
+                left = min(max(x1, column * self.cell_size), x2)
+                right = max(min(x2, (column + 1) * self.cell_size), x1)
+                low_y = y1 + (y2 - y1) * (left - x1) / (x2 - x1)
+                high_y = y1 + (y2 - y1) * (right - x1) / (x2 - x1)
+            low_row = self.cell(0, min(low_y, high_y) - padding)[1]
+            high_row = self.cell(0, max(low_y, high_y) + padding)[1]
+            for row in range(low_row, high_row + 1):
+                cells.append((column, row))
+        return cells
+
+class RoomIndex:
+    '''
+    Point location for rooms: every room's polygon (the corners discover_room walked around it) as a float64 array, and a uniform grid whose cells
+    list the rooms whose bounding boxes reach into them. Finding the room a point is in is a cell lookup plus a crossing number test against
+    the few rooms listed there, instead of casting a ray and walking the corners until a doorway turns up.
+    '''
+
+    def __init__(self, rooms, cell_size = 128):
+        self.cell_size = float(cell_size)
+        self.rooms = [room for room in rooms if len(room.corners) >= 3]
+        self.polygons = [np.array([[float(c.x), float(c.y)] for c in room.corners], dtype = np.float64) for room in self.rooms]
+        self.edges = [np.column_stack((p, np.roll(p, -1, axis = 0))) for p in self.polygons] #(x1, y1, x2, y2) of every side, the last one closing the polygon
+        self.edge_lists = [[tuple(edge) for edge in edges.tolist()] for edges in self.edges] #the same as plain floats, single points are tested in pure Python
+        self.boxes = np.array([[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in self.polygons], dtype = np.float64).reshape(-1, 4)
+        self.cells = {} #(cell x, cell y) -> indices of the rooms whose bounding boxes reach into the cell
+        for i, (min_x, min_y, max_x, max_y) in enumerate(self.boxes):
+            low_x, low_y = self.cell(min_x, min_y)
+            high_x, high_y = self.cell(max_x, max_y)
+            for cx in range(low_x, high_x + 1):
+                for cy in range(low_y, high_y + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def cell(self, x, y):
+        return math.floor(float(x) / self.cell_size), math.floor(float(y) / self.cell_size)
+
+    #is the point inside the polygon with these edges, by counting the edges a ray towards +x crosses
+    @staticmethod
+    def inside(edges, x, y):
+        ret = False
+        for x1, y1, x2, y2 in edges:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1): #only edges whose y range holds y, never horizontal ones
+                ret = not ret
+        return ret
+
+    #inside for an array of points (xs and ys) at once
+    @staticmethod
+    def inside_many(edges, xs, ys):
+        x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+        spans = (y1 > ys[:, None]) != (y2 > ys[:, None])
+        crossing_x = x1 + np.divide((ys[:, None] - y1) * (x2 - x1), y2 - y1, out = np.zeros(spans.shape), where = spans)
+        return np.count_nonzero(spans & (xs[:, None] < crossing_x), axis = 1) % 2 == 1
+
+    #the room the point is in, None if it isn't inside any
+    def room_at(self, x, y):
+        x, y = float(x), float(y)
+        for i in self.cells.get(self.cell(x, y), ()):
+            if self.inside(self.edge_lists[i], x, y):
+                return self.rooms[i]
+        return None
+
+    #room_at for an (n, 2) array of points at once (the enemies or items of a frame), a list with None for the points outside every room
+    #the points are bucketed by grid cell and each room is only tested against the points in the cells that list it, in the same order room_at tries them
+    def rooms_at(self, points):
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 2)
+        if len(points) == 0:
+            return []
+        found = np.full(len(points), -1)
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        low = cells.min(axis = 0)
+        keys = (cells[:, 0] - low[0]) * (cells[:, 1].max() - low[1] + 1) + (cells[:, 1] - low[1]) #one int per cell, sorts much faster than rows
+        order = np.argsort(keys, kind = "stable") #the points of each cell next to each other
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys[order])) + 1))
+        ends = np.append(starts[1:], len(points))
+        members = {} #room index -> slices of order holding the points in the cells that list the room
+        for (cx, cy), start, end in zip(cells[order[starts]].tolist(), starts.tolist(), ends.tolist()):
+            for i in self.cells.get((cx, cy), ()):
+                members.setdefault(i, []).append(order[start:end])
+        for i in sorted(members): #every cell lists its rooms by index, so the lowest index containing a point wins like in room_at
+            candidates = np.concatenate(members[i])
+            candidates = candidates[found[candidates] < 0]
+            if len(candidates) > 0:
+                found[candidates[self.inside_many(self.edges[i], points[candidates, 0], points[candidates, 1])]] = i
+        return [self.rooms[i] if i >= 0 else None for i in found]
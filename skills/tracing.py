@@ -0,0 +1,157 @@
+'''
+Level-gated tracing for the navigation skills, replaces the unconditional DEBUGGING prints.
+Each category (planner, geometry, map, agent) has its own level, a message below it is dropped before it's ever formatted:
+    trace.planner.debug("expanded %d nodes", count) #only formatted and written when the planner is at DEBUG or above
+Hot loops check the channel's flag first so a disabled trace costs a single attribute lookup:
+    if trace.planner.is_trace: trace.planner.trace("handling %s", tile)
+Enabled events go to every sink, the console by default, a RingBuffer or FileSink can be added for post-mortem analysis.
+The environment can configure it before anything runs:
+    NAVIGATION_TRACE="info" or "planner=trace,agent=debug"
+    NAVIGATION_TRACE_FILE=path/to/trace.log
+'''
+import collections
+import os
+import sys
+import time
+
+OFF, ERROR, INFO, DEBUG, TRACE = range(5)
+LEVEL_NAMES = ("OFF", "ERROR", "INFO", "DEBUG", "TRACE")
+CATEGORIES = ("planner", "geometry", "map", "agent")
+
+def parse_level(level):
+    if isinstance(level, str):
+        return LEVEL_NAMES.index(level.upper())
+    return level
+
+class Channel:
+    '''
+    One category of messages and its level, the is_* flags are kept in sync with the level for hot paths to check.
+    '''
+
+    def __init__(self, tracer, category, level = ERROR):
+        self.tracer = tracer
+        self.category = category
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = parse_level(level)
+        self.is_error = self.level >= ERROR
+        self.is_info = self.level >= INFO
+        self.is_debug = self.level >= DEBUG
+        self.is_trace = self.level >= TRACE
+
+    #message is only %-formatted with args once we know the event is wanted
+    def log(self, level, message, *args):
+        if self.level >= level:
+            self.tracer.record(self.category, level, message % args if args else message)
+
+    def error(self, message, *args):
+        if self.is_error:
+            self.tracer.record(self.category, ERROR, message % args if args else message)
+
+    def info(self, message, *args):
+        if self.is_info:
+            self.tracer.record(self.category, INFO, message % args if args else message)
+
+    def debug(self, message, *args):
+        if self.is_debug:
+            self.tracer.record(self.category, DEBUG, message % args if args else message)
+
+    def trace(self, message, *args):
+        if self.is_trace:
+            self.tracer.record(self.category, TRACE, message % args if args else message)
+
+class ConsoleSink:
+    def __init__(self, stream = None):
+        self.stream = stream
+
+    def write(self, event):
+        timestamp, category, level, message = event
+        print(f"{level} {category}: {message}", file = self.stream if self.stream != None else sys.stdout)
+
+class RingBuffer:
+    '''
+    Keeps the last capacity events in memory, dump them after something went wrong.
+    '''
+
+    def __init__(self, capacity = 10000):
+        self.events = collections.deque(maxlen = capacity)
+
+    def __len__(self):
+        return len(self.events)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for event in self.events:
+                f.write(format_event(event))
+
+class FileSink:
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, event):
+        self.file.write(format_event(event))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def format_event(event):
+    timestamp, category, level, message = event
+    return f"{timestamp:.6f} {level} {category}: {message}\n"
+
+class Tracer:
+    '''
+    Holds a Channel per category (trace.planner, trace.geometry, trace.map, trace.agent) and the sinks enabled events are written to.
+    '''
+
+    def __init__(self, level = ERROR):
+        self.sinks = [ConsoleSink()]
+        self.channels = {}
+        for category in CATEGORIES:
+            channel = Channel(self, category, level)
+            self.channels[category] = channel
+            setattr(self, category, channel)
+
+    #set the level of the given categories, or all of them if none are given
+    def set_level(self, level, *categories):
+        for category in (categories if len(categories) > 0 else CATEGORIES):
+            self.channels[category].set_level(level)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def record(self, category, level, message):
+        event = (time.perf_counter(), category, LEVEL_NAMES[level], message)
+        for sink in self.sinks:
+            sink.write(event)
+
+    #"debug" sets every category, "planner=trace,agent=info" sets each one given
+    def configure(self, spec):
+        for part in spec.split(","):
+            part = part.strip()
+            if part == "":
+                continue
+            if "=" in part:
+                category, level = part.split("=", 1)
+                self.set_level(level.strip(), category.strip())
+            else:
+                self.set_level(part)
+
+trace = Tracer()
+if os.environ.get("NAVIGATION_TRACE") != None:
+    trace.configure(os.environ["NAVIGATION_TRACE"])
+if os.environ.get("NAVIGATION_TRACE_FILE") != None:
+    trace.add_sink(FileSink(os.environ["NAVIGATION_TRACE_FILE"]))
@@ -0,0 +1,16 @@
+import numpy as np
+from skills.geometry import coord_tuple
+from skills.occupancy import OccupancyGrid
+from skills.anyangle import LazyThetaStar
+
+#an open 8 by 8 tile room with the start tile blocked, like the agent standing inside an enemy's footprint
+def blocked_start_planner():
+    occupancy = OccupancyGrid(coord_tuple(0.0, 0.0), 16.0, (0, 0, 127, 127))
+    occupancy.block((1, 1))
+    circles = np.array([(24.0, 24.0, 20.0)]) #the enemy, covering the start tile's center
+    return LazyThetaStar(occupancy, np.zeros((0, 4)), circles, 16)
+
+def test_plan_from_blocked_start():
+    path = blocked_start_planner().plan((1, 1), (6, 6))
+    assert path != None
+    assert path[0] == (1, 1) and path[-1] == (6, 6)
@@ -0,0 +1,52 @@
+import time
+import skills.Navigation
+from skills.Navigation import Navigator
+from skills.incremental import DStarLite
+from skills.geometry import coord_tuple, backend
+
+#two rooms joined by a doorway, the agent starts in the bigger one
+def walls():
+    corners = [(0, 0), (256, 0), (256, 64), (512, 64), (512, 192), (256, 192), (256, 256), (0, 256)]
+    return [{"x1": a[0], "y1": a[1], "x2": b[0], "y2": b[1]} for a, b in zip(corners, corners[1:] + corners[:1])]
+
+def point(x, y):
+    return coord_tuple(backend.number(x), backend.number(y))
+
+#plan a segment on the worker and wait for it
+def plan(navigator, start, destination):
+    ret = navigator.plan_segment(start, destination)
+    deadline = time.time() + 10
+    while ret == None and time.time() < deadline:
+        time.sleep(0.01)
+        ret = navigator.collect_plan()
+    return ret
+
+def test_background_repair_reuses_the_search(monkeypatch):
+    counts = {"built": 0, "repaired": 0}
+    class CountingDStarLite(DStarLite):
+        def __init__(self, *args):
+            counts["built"] += 1
+            DStarLite.__init__(self, *args)
+        def move_start(self, start):
+            counts["repaired"] += 1
+            DStarLite.move_start(self, start)
+    monkeypatch.setattr(skills.Navigation, "DStarLite", CountingDStarLite)
+
+    navigator = Navigator(background_planning = True)
+    navigator.update_features({"enemies": [], "items": {"obstacle": []}, "walls": walls(),
+        "player": {"x_position": 64, "y_position": 64, "angle": 0}})
+    start, destination = point(64, 64), point(200, 200)
+    navigator.set_tile_bias(start)
+    navigator.path_rooms = [navigator.room_at(start.x, start.y)]
+    try:
+        path_tiles = plan(navigator, start, destination)[0] #a fresh segment, planned with A*
+        assert counts["built"] == 0
+        for _ in range(2): #block the path twice, the second repair has to carry on with the first one's search
+            navigator.replanning = True
+            navigator.access_tiles.add(path_tiles[len(path_tiles) // 2])
+            path_tiles = plan(navigator, start, destination)[0]
+            assert path_tiles != None
+        assert counts["built"] == 1
+        assert counts["repaired"] == 1
+    finally:
+        navigator.stop_planning()